@@ -0,0 +1,159 @@
+# Benchmark suite for ingestion, KPI computation, display formatting, export and chart building.
+#
+#   python -m benchmarks.run                         # 1k, 100k and 1M rows
+#   python -m benchmarks.run --sizes 10M -o bench_10m.json
+#   python -m benchmarks.run --compare bench_results_old.json
+#
+# Each stage is timed (best of --repeat runs) and then run once more under tracemalloc for its
+# peak memory. Results are written as JSON so runs from different versions can be compared.
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from oee_engine import (PagedView, available_backends, calculate_kpis, calculate_oee, export_file, format_page,
+                        scenario_base, simulate)
+from benchmarks.synthetic import generate_production_data
+
+DEFAULT_SIZES = ["1k", "100k", "1M"]
+SUFFIXES = {"k": 1_000, "M": 1_000_000}
+
+
+def parse_size(text):
+    if text[-1] in SUFFIXES:
+        return int(float(text[:-1]) * SUFFIXES[text[-1]])
+    return int(text)
+
+
+def format_applymap(df):
+    # Per-cell formatting as done in oee_tool_01.py
+    frame = df[["Availability", "Performance", "Quality", "OEE"]]
+    cell_map = getattr(frame, "map", None) or frame.applymap
+    return cell_map(lambda x: f"{x*100:.2f}%" if isinstance(x, float) else x)
+
+
+def build_stages(df, csv_bytes, results):
+    stages = {
+        "csv_parse": lambda: pd.read_csv(io.BytesIO(csv_bytes)),
+        "calculate_oee": lambda: calculate_oee(df.copy()),
+        "calculate_kpis": lambda: calculate_kpis(df.copy()),
+        "format_applymap": lambda: format_applymap(results),
+        # What the apps do now: sort once on the server, format only the first visible page
+        "paged_table": lambda: format_page(PagedView(results).page(0, sort_by="OEE")),
+        "simulate": lambda: simulate(scenario_base(results), {"Downtime": ("triangular", 0.8, 1.0, 1.1),
+                                                              "Speed": ("normal", 1.0, 0.03), "Scrap": ("uniform", 0.5, 1.0)}, seed=0),
+        "csv_export": lambda: results.to_csv(index=False).encode("utf-8"),
+        # What the download buttons do now: write slice by slice to a temp file
+        "export_csv": lambda: export_file(results, "csv"),
+        "export_csv_gz": lambda: export_file(results, "csv.gz"),
+    }
+    for backend in available_backends():
+        stages[f"calculate_kpis_{backend}"] = lambda backend=backend: calculate_kpis(df.copy(), backend)
+    try:
+        from oee_charts import build_benchmark_chart, build_gauge_panel
+    except ImportError:
+        return stages
+    labels = results["Description"]
+    stages["benchmark_chart"] = lambda: build_benchmark_chart("OEE by Machine / Process", results["OEE"] * 100, 85,
+                                                              x_labels=labels).to_json()
+    stages["benchmark_chart_unlabeled"] = lambda: build_benchmark_chart("OEE", results["OEE"] * 100, 85).to_json()
+    stages["gauge_panel"] = lambda: build_gauge_panel(results.iloc[0]).to_json()
+    return stages
+
+
+def measure(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+    }
+
+
+def run(sizes, repeat=3, stages=None, seed=0):
+    records = []
+    for size in sizes:
+        rows = parse_size(size)
+        df = generate_production_data(rows, seed=seed)
+        csv_bytes = df.to_csv(index=False).encode("utf-8")
+        results = calculate_kpis(df.copy())
+        for name, func in build_stages(df, csv_bytes, results).items():
+            if stages and name not in stages:
+                continue
+            seconds, peak = measure(func, repeat if rows <= 1_000_000 else 1)
+            records.append({
+                "rows": rows,
+                "stage": name,
+                "seconds": seconds,
+                "rows_per_second": rows / seconds if seconds else None,
+                "peak_bytes": peak,
+            })
+            print(f"{size:>6} {name:<26} {seconds * 1000:10.1f} ms {peak / 1024**2:10.1f} MB", file=sys.stderr)
+    return records
+
+
+def compare(records, baseline_path, threshold=1.2):
+    # Prints stages that got slower than threshold x the baseline; returns how many regressed
+    with open(baseline_path) as f:
+        baseline = {(r["rows"], r["stage"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    for record in records:
+        old = baseline.get((record["rows"], record["stage"]))
+        if not old or not old["seconds"]:
+            continue
+        ratio = record["seconds"] / old["seconds"]
+        if ratio > threshold:
+            regressions += 1
+            print(f"REGRESSION {record['rows']:>10} {record['stage']:<26} {ratio:5.2f}x slower", file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmarks.run", description="Benchmark KPI ingestion, computation and rendering.")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="Row counts, e.g. 1k 100k 1M 10M")
+    parser.add_argument("--stages", nargs="+", default=None, help="Only run these stages")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions per stage (best is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="bench_results.json", help="JSON results file")
+    parser.add_argument("--compare", default=None, help="Earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Slowdown ratio reported as a regression by --compare (default: 1.2)")
+    args = parser.parse_args(argv)
+
+    records = run(args.sizes, args.repeat, args.stages, args.seed)
+    with open(args.output, "w") as f:
+        json.dump({"meta": metadata(), "results": records}, f, indent=2)
+    if args.compare:
+        return 1 if compare(records, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
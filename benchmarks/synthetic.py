@@ -0,0 +1,23 @@
+# Reproducible synthetic production data in the shape of an hourly MES export.
+import numpy as np
+import pandas as pd
+
+
+def generate_production_data(rows, machines=200, seed=0, start="2026-01-01"):
+    rng = np.random.default_rng(seed)
+    machine = rng.integers(0, machines, rows)
+    planned = np.full(rows, 60.0)
+    downtime = np.round(rng.gamma(1.5, 3.0, rows).clip(0, 55), 1)
+    ideal_cycle_time = np.round(0.4 + 0.05 * (machine % 7), 2)
+    run_time = planned - downtime
+    total = np.floor(run_time / ideal_cycle_time * rng.uniform(0.7, 1.0, rows)).astype(np.int64)
+    good = total - rng.binomial(total, 0.02)
+    return pd.DataFrame({
+        "Timestamp": pd.Timestamp(start) + pd.to_timedelta(np.arange(rows) // machines, unit="h"),
+        "Description": np.char.add("Machine ", machine.astype(str)),
+        "Planned Production Time": planned,
+        "Downtime": downtime,
+        "Total Count": total,
+        "Good Count": good,
+        "Ideal Cycle Time": ideal_cycle_time,
+    })
@@ -0,0 +1,196 @@
+# Plotly figure builders for the dashboards. No streamlit here, so figures can be built
+# (and cached, benchmarked) outside a running app.
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from oee_engine.specs import KPI_SPECS, is_alert, kpi_value
+
+MAX_BARS = 41        # above this many records, bars are reduced to the top/bottom N plus one "Others" bar
+WEBGL_ROWS = 2000    # above this many records without labels, a decimated WebGL trace replaces the bars
+MAX_POINTS = 2000
+
+
+def select_extremes(values, labels, n):
+    # Top n and bottom n values; everything in between is averaged into a single "Others" entry
+    # NaN (e.g. zero Total Count) sorts to the bottom instead of the top
+    order = np.argsort(np.where(np.isnan(values), -np.inf, values), kind="stable")[::-1]
+    keep = np.concatenate([order[:n], order[-n:]])
+    rest = order[n:-n]
+    y = values[keep]
+    x = [str(label) for label in labels[keep]]
+    if len(rest):
+        x.append(f"Others ({len(rest):,} avg)")
+        y = np.append(y, np.nanmean(values[rest]))
+    return x, y
+
+
+def decimate(values, max_points=MAX_POINTS):
+    # Min/max envelope per bin keeps spikes visible with a bounded number of points
+    bins = max(max_points // 2, 1)
+    starts = np.linspace(0, len(values), bins + 1).astype(int)[:-1]
+    starts = np.unique(starts)
+    lows = np.fmin.reduceat(values, starts)
+    highs = np.fmax.reduceat(values, starts)
+    return np.repeat(starts + 1, 2), np.column_stack([lows, highs]).ravel()
+
+
+def add_benchmark(fig, benchmark):
+    # One shape instead of a per-point series
+    fig.add_hline(
+        y=benchmark,
+        line=dict(dash="dash", color="darkorange"),
+        annotation_text=f"Benchmark {benchmark:.1f}%",
+        annotation_position="top right",
+        annotation_font_color="darkorange",
+    )
+
+
+def build_benchmark_chart(title, values, benchmark, x_labels=None, max_bars=MAX_BARS, webgl_rows=WEBGL_ROWS,
+                          max_points=MAX_POINTS):
+    values = np.asarray(values, dtype=float)
+    labels = np.asarray(x_labels) if x_labels is not None else None
+    fig = go.Figure()
+
+    if labels is None and len(values) > webgl_rows:
+        x, y = decimate(values, max_points)
+        fig.add_trace(go.Scattergl(x=x, y=y, mode="lines", name=title, line=dict(color="steelblue")))
+        subtitle = f" (min/max of {len(values):,} records)"
+    else:
+        if len(values) > max_bars:
+            top_n = max((max_bars - 1) // 2, 1)
+            x, y = select_extremes(values, labels if labels is not None else np.arange(1, len(values) + 1), top_n)
+            subtitle = f" (top and bottom {top_n} of {len(values):,})"
+        else:
+            x = labels if labels is not None else np.arange(1, len(values) + 1)
+            y = values
+            subtitle = ""
+
+        # Bar plot for KPI values with labels inside
+        fig.add_trace(go.Bar(
+            x=x,
+            y=y,
+            name=title,
+            text=[f"{v:.1f}%" for v in y],
+            textposition='inside',
+            insidetextanchor="middle",
+            textfont=dict(color='white'),
+            marker_color='steelblue'
+        ))
+
+    add_benchmark(fig, benchmark)
+    fig.update_layout(
+        title=title + subtitle,
+        xaxis_title="Description" if labels is not None else "Record",
+        yaxis_title=title,
+        barmode='group',
+        height=400
+    )
+    return fig
+
+
+def build_gauge_panel(row, specs=None, columns=2, alerted=None):
+    # alerted: KPI titles to draw in the alert color; defaults to each spec's own threshold
+    # All KPI gauges in one figure: one serialization and one round-trip instead of one per KPI
+    specs = KPI_SPECS if specs is None else specs
+    rows = -(-len(specs) // columns)
+    fig = make_subplots(rows=rows, cols=columns, specs=[[{"type": "indicator"}] * columns] * rows,
+                        vertical_spacing=0.15)
+    for i, spec in enumerate(specs):
+        value = kpi_value(spec, row)
+        fig.add_trace(go.Indicator(
+            mode="gauge+number",
+            value=value,
+            number={'suffix': "%"},
+            title={'text': spec["title"]},
+            gauge={
+                'axis': {'range': [0, 100]},
+                'bar': {'color': "crimson" if (spec["title"] in alerted if alerted is not None else is_alert(spec, value))
+                        else "darkblue"},
+                'steps': [{'range': [low, high], 'color': color} for low, high, color in spec["steps"]]
+            }
+        ), row=i // columns + 1, col=i % columns + 1)
+    fig.update_layout(height=260 * rows, margin=dict(t=40, b=20))
+    return fig
+
+
+def build_pareto_chart(pareto, max_bars=MAX_BARS, title="Downtime by Reason"):
+    # Bars for the largest reasons (the long tail folded into "Others"), cumulative share on a second axis
+    reasons = [str(reason) for reason in pareto["Reason"]]
+    minutes = np.asarray(pareto["Downtime"], dtype=float)
+    cumulative = np.asarray(pareto["Cumulative (%)"], dtype=float)
+    if len(minutes) > max_bars:
+        keep = max_bars - 1
+        reasons = reasons[:keep] + [f"Others ({len(minutes) - keep:,} reasons)"]
+        minutes = np.append(minutes[:keep], minutes[keep:].sum())
+        cumulative = np.append(cumulative[:keep], 100.0 if len(cumulative) else 0.0)
+
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(go.Bar(
+        x=reasons,
+        y=minutes,
+        name="Downtime (min)",
+        text=[f"{v:,.0f}" for v in minutes],
+        textposition='inside',
+        insidetextanchor="middle",
+        textfont=dict(color='white'),
+        marker_color='steelblue'
+    ))
+    fig.add_trace(go.Scatter(x=reasons, y=cumulative, name="Cumulative %", mode="lines+markers",
+                             line=dict(color="darkorange")), secondary_y=True)
+    fig.add_hline(y=80, line=dict(dash="dash", color="gray"), secondary_y=True)
+    fig.update_layout(title=title, xaxis_title="Reason", height=400, showlegend=False)
+    fig.update_yaxes(title_text="Downtime (min)", secondary_y=False)
+    fig.update_yaxes(title_text="Cumulative %", range=[0, 105], secondary_y=True)
+    return fig
+
+
+def build_trend_chart(trend, metric, benchmark=None, scale=100, group_column="Description", max_lines=10):
+    # One line per machine, or a single fleet line when the frame has no machine column
+    fig = go.Figure()
+    groups = trend.groupby(group_column, sort=True) if group_column in trend.columns else [(metric, trend)]
+    for i, (name, group) in enumerate(groups):
+        fig.add_trace(go.Scatter(x=group["Period"], y=group[metric] * scale, mode="lines+markers", name=str(name),
+                                 visible=True if i < max_lines else "legendonly"))
+    if benchmark is not None:
+        add_benchmark(fig, benchmark)
+    fig.update_layout(title=f"{metric} over Time", xaxis_title="Period", yaxis_title=metric, height=400)
+    return fig
+
+
+def build_scenario_histogram(oee, baseline, benchmark=None, bins=50, title="Fleet OEE across Scenarios"):
+    # Binned here so the figure carries the bin counts, not one value per scenario
+    values = np.asarray(oee, dtype=float) * 100
+    values = values[np.isfinite(values)]
+    counts, edges = np.histogram(values, bins=bins)
+    fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges), marker_color="steelblue",
+                           name="Scenarios"))
+    fig.add_vline(x=baseline * 100, line=dict(color="black"), annotation_text=f"Today {baseline * 100:.1f}%",
+                  annotation_position="top left")
+    if benchmark is not None:
+        fig.add_vline(x=benchmark, line=dict(dash="dash", color="darkorange"), annotation_text=f"Benchmark {benchmark:.1f}%",
+                      annotation_position="top right", annotation_font_color="darkorange")
+    fig.update_layout(title=title, xaxis_title="OEE (%)", yaxis_title="Scenarios", bargap=0, height=400, showlegend=False)
+    return fig
+
+
+def build_sensitivity_chart(sensitivity, low="OEE change at P10 (pp)", high="OEE change at P90 (pp)",
+                            title="OEE Sensitivity by Loss Category"):
+    # Tornado: one bar per loss spanning today (0) and its low- and high-percentile effects, largest impact on top
+    rows = sensitivity.iloc[::-1]
+    lows = np.asarray(rows[low], dtype=float)
+    highs = np.asarray(rows[high], dtype=float)
+    starts = np.minimum(np.minimum(lows, highs), 0)
+    ends = np.maximum(np.maximum(lows, highs), 0)
+    fig = go.Figure(go.Bar(
+        y=rows["Loss"],
+        x=ends - starts,
+        base=starts,
+        orientation="h",
+        marker_color=np.where(lows + highs >= 0, "seagreen", "indianred"),
+        text=[f"{a:+.2f} … {b:+.2f} pp" for a, b in zip(lows, highs)],
+        textposition="outside",
+    ))
+    fig.add_vline(x=0, line=dict(color="black"))
+    fig.update_layout(title=title, xaxis_title="OEE change vs. today (percentage points)", height=300, showlegend=False)
+    return fig
@@ -0,0 +1,24 @@
+from .tables import (EXPORT_CHUNK_ROWS, INPUT_COLUMNS, INPUT_FORMATS, MIME_TYPES, OUTPUT_FORMATS, detect_format, export_file,
+                     iter_table_chunks, output_format, read_table, table_bytes, write_chunks, write_table)
+from .kpis import (CHUNK_SIZE, KPI_COLUMNS, KPI_FORMULAS, OEE_COLUMNS, REQUIRED_COLUMNS, TOTAL_COLUMNS,
+                   accumulate_totals, calculate_kpis, calculate_kpis_streaming, calculate_oee, derive, evaluate_formulas,
+                   fleet_kpis, missing_columns, new_totals)
+from .rollup import (BUCKETS, TIME_COLUMN, bucket_start, combine_rollups, kpis_from_sums, rollup_kpis,
+                     rollup_sums)
+from .compact import compact_frame, compact_kpis, full_kpi_nbytes, memory_report
+from .specs import KPI_SPECS, is_alert, kpi_value
+from .incremental import IncrementalKPIs, row_fingerprints
+from .parallel import SOURCE_COLUMN, default_workers, fleet_table, map_files, process_sources, source_totals
+from .instrument import StageTimer
+from .validate import REJECT_COLUMN, VALIDATION_RULES, rule_counts, validate_rows
+from .alerts import alert_counts, default_thresholds, evaluate_alerts
+from .downtime import (EVENT_COLUMNS, apply_event_downtime, downtime_pareto, event_downtime, merge_events,
+                       merged_intervals, sweep_events)
+from .live import (CSVTail, DEFAULT_LIVE_CSV, LIVE_CSV_ENV, LIVE_HOST_ENV, LIVE_PORT_ENV, RollingOEE, SOCKET_HOST,
+                   SOCKET_PORT, SocketFeed, SyntheticFeed)
+from .store import DEFAULT_STORE_PATH, STORE_PATH_ENV, KPIStore
+from .backends import BACKENDS, available_backends, choose_backend, compute_columns
+from .paging import PAGE_SIZE, PERCENT_SCALES, PagedView, format_page
+from .hierarchy import HIERARCHY_LEVELS, UNASSIGNED, KPICube, machine_sums, read_hierarchy
+from .parts import PART_COLUMN, PART_MASTER_COLUMNS, PART_MASTER_ENV, apply_part_master, load_part_master, read_part_master
+from .scenarios import DISTRIBUTIONS, LOSS_FACTORS, SCENARIOS, scenario_base, scenario_kpis, simulate
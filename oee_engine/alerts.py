@@ -0,0 +1,81 @@
+# Vectorized KPI alerts: every row x KPI is checked against the threshold table in one array
+# operation, with optional per-machine overrides, and breaches are ranked worst first.
+from .rollup import GROUP_COLUMN
+from .specs import KPI_SPECS
+
+ALERT_COLUMNS = ["Row", GROUP_COLUMN, "KPI", "Value", "Threshold", "Shortfall", "Severity"]
+
+
+def default_thresholds(specs=None):
+    import pandas as pd
+
+    specs = KPI_SPECS if specs is None else specs
+    return pd.DataFrame({
+        "KPI": [spec["title"] for spec in specs],
+        "Column": [spec["column"] for spec in specs],
+        "Scale": [spec["scale"] for spec in specs],
+        "Threshold": [float(spec["threshold"]) for spec in specs],
+        "Higher Is Worse": [spec["reverse"] for spec in specs],
+    })
+
+
+def threshold_matrix(results, thresholds, machine_thresholds=None, group_column=GROUP_COLUMN):
+    # (rows x KPIs) thresholds: the table default, replaced where a machine override exists.
+    # machine_thresholds is a long table with group_column, KPI and Threshold columns.
+    import numpy as np
+    import pandas as pd
+
+    defaults = thresholds["Threshold"].to_numpy(dtype=float)
+    matrix = np.broadcast_to(defaults, (len(results), len(defaults)))
+    if machine_thresholds is None or not len(machine_thresholds) or group_column not in results.columns:
+        return matrix
+
+    overrides = machine_thresholds.pivot_table(index=group_column, columns="KPI", values="Threshold", aggfunc="last")
+    overrides = overrides.reindex(columns=thresholds["KPI"])
+    codes = pd.Categorical(results[group_column].astype(str), categories=overrides.index.astype(str)).codes
+    per_row = np.where((codes >= 0)[:, None], overrides.to_numpy(dtype=float)[codes.clip(min=0)], np.nan)
+    return np.where(np.isnan(per_row), matrix, per_row)
+
+
+def shortfalls(results, thresholds=None, machine_thresholds=None, group_column=GROUP_COLUMN):
+    # Returns (thresholds, values, limits, shortfall) as (rows x KPIs) arrays. A positive shortfall is
+    # how far a value is on the wrong side of its threshold, in KPI points.
+    import numpy as np
+
+    thresholds = default_thresholds() if thresholds is None else thresholds
+    values = results[list(thresholds["Column"])].to_numpy(dtype=float) * thresholds["Scale"].to_numpy(dtype=float)
+    limits = threshold_matrix(results, thresholds, machine_thresholds, group_column)
+    direction = np.where(thresholds["Higher Is Worse"].to_numpy(dtype=bool), -1.0, 1.0)
+    return thresholds, values, limits, (limits - values) * direction
+
+
+def evaluate_alerts(results, thresholds=None, machine_thresholds=None, group_column=GROUP_COLUMN, limit=None):
+    import numpy as np
+    import pandas as pd
+
+    thresholds, values, limits, shortfall = shortfalls(results, thresholds, machine_thresholds, group_column)
+    rows, cols = np.nonzero(shortfall > 0)
+    gap = shortfall[rows, cols]
+    severity = gap / np.maximum(np.abs(limits[rows, cols]), 1e-9)
+
+    if limit is not None and len(severity) > limit:
+        top = np.argpartition(-severity, limit)[:limit]
+        rows, cols, gap, severity = rows[top], cols[top], gap[top], severity[top]
+    order = np.argsort(-severity, kind="stable")
+    rows, cols, gap, severity = rows[order], cols[order], gap[order], severity[order]
+
+    return pd.DataFrame({
+        "Row": results.index.to_numpy()[rows],
+        group_column: results[group_column].to_numpy()[rows] if group_column in results.columns else None,
+        "KPI": thresholds["KPI"].to_numpy()[cols],
+        "Value": values[rows, cols],
+        "Threshold": limits[rows, cols],
+        "Shortfall": gap,
+        "Severity": severity,
+    }, columns=ALERT_COLUMNS)
+
+
+def alert_counts(results, thresholds=None, machine_thresholds=None, group_column=GROUP_COLUMN):
+    # Breaching rows per KPI without building the alert table
+    thresholds, _, _, shortfall = shortfalls(results, thresholds, machine_thresholds, group_column)
+    return dict(zip(thresholds["KPI"], (shortfall > 0).sum(axis=0).tolist()))
@@ -0,0 +1,101 @@
+# Interchangeable compute backends for the KPI formulas. Every backend runs KPI_FORMULAS through evaluate_formulas;
+# only the column getter differs: pandas Series, NumPy arrays, or Polars expressions fused into one lazy query.
+import os
+
+from .kpis import evaluate_formulas
+
+BACKENDS = ["pandas", "numpy", "polars"]
+BACKEND_ENV = "OEE_BACKEND"
+# Auto selection: below NUMPY_ROWS pandas' per-op overhead doesn't matter; above POLARS_ROWS the fused
+# Polars query wins if Polars is installed and has more than one core to spread it over
+NUMPY_ROWS = 10_000
+POLARS_ROWS = 1_000_000
+
+
+def polars_available():
+    try:
+        import polars  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def available_backends():
+    return [name for name in BACKENDS if name != "polars" or polars_available()]
+
+
+def choose_backend(rows, backend=None):
+    # Explicit argument, then the OEE_BACKEND environment variable, then by data size
+    backend = backend or os.environ.get(BACKEND_ENV) or "auto"
+    if backend == "auto":
+        if rows >= POLARS_ROWS and (os.cpu_count() or 1) > 1 and polars_available():
+            return "polars"
+        return "numpy" if rows >= NUMPY_ROWS else "pandas"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'; expected auto or one of {', '.join(BACKENDS)}")
+    if backend == "polars" and not polars_available():
+        raise ValueError("The polars backend needs the optional 'polars' package")
+    return backend
+
+
+def formula_inputs(names, columns):
+    # Base columns the requested outputs read, resolving derived columns that aren't already present
+    import numpy as np
+
+    inputs = []
+
+    def getter(col):
+        if col not in inputs:
+            inputs.append(col)
+        return np.float64(1.0)
+
+    with np.errstate(all="ignore"):
+        evaluate_formulas(names, getter, columns)
+    return inputs
+
+
+def pandas_kpis(df, names):
+    return evaluate_formulas(names, df.__getitem__, df.columns)
+
+
+def numpy_kpis(df, names):
+    # Plain ndarrays: no index alignment or Series construction per intermediate
+    import numpy as np
+
+    arrays = {}
+
+    def getter(col):
+        if col not in arrays:
+            arrays[col] = df[col].to_numpy()
+        return arrays[col]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return evaluate_formulas(names, getter, df.columns)
+
+
+def polars_kpis(df, names):
+    # All outputs in one lazy select over only the columns they read; Polars fuses the arithmetic and
+    # eliminates the shared subexpressions (Run Time, Ideal Time, ...) instead of materializing them
+    import polars as pl
+
+    inputs = formula_inputs(names, df.columns)
+    expressions = evaluate_formulas(names, pl.col, df.columns)
+    result = (pl.from_pandas(df[inputs]).lazy()
+              .select([expression.alias(name) for name, expression in expressions.items()])
+              .collect())
+    return {name: result.get_column(name).to_numpy() for name in names}
+
+
+BACKEND_FUNCTIONS = {"pandas": pandas_kpis, "numpy": numpy_kpis, "polars": polars_kpis}
+
+
+def compute_columns(df, names, backend=None):
+    # Adds the named KPI columns to df in place, like calculate_kpis always has
+    import pandas as pd
+
+    values = BACKEND_FUNCTIONS[choose_backend(len(df), backend)](df, names)
+    for name in names:
+        value = values[name]
+        # Wrapping arrays in a Series first lets pandas take them without another copy
+        df[name] = value if isinstance(value, pd.Series) else pd.Series(value, index=df.index, copy=False)
+    return df
@@ -0,0 +1,172 @@
+# Headless batch entry point: python -m oee_engine data.csv [more.parquet ...]
+import argparse
+import json
+import os
+import sys
+
+from .backends import BACKENDS
+from .tables import OUTPUT_FORMATS, output_format, read_table, write_table
+from .kpis import (CHUNK_SIZE, accumulate_totals, calculate_kpis, calculate_kpis_streaming, calculate_oee,
+                   fleet_kpis, missing_columns, new_totals)
+from .parallel import default_workers, fleet_table, map_files
+from .parts import PART_MASTER_ENV, apply_part_master, load_part_master
+from .rollup import BUCKETS, TIME_COLUMN, combine_rollups, kpis_from_sums, rollup_sums
+from .validate import validate_rows
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="oee_engine",
+        description="Calculate OEE and manufacturing KPIs for one or more CSV/Parquet/Feather production files.",
+    )
+    parser.add_argument("inputs", nargs="+", help="CSV, Parquet or Arrow/Feather files with the required production columns")
+    parser.add_argument("-o", "--output-dir", default=None,
+                        help="Directory for the results (default: next to each input file)")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default="csv", help="Output format (default: csv)")
+    parser.add_argument("--oee-only", action="store_true",
+                        help="Only compute Availability, Performance, Quality and OEE")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE,
+                        help=f"Rows per chunk when streaming to CSV output (default: {CHUNK_SIZE})")
+    parser.add_argument("--rollup", choices=BUCKETS, default=None,
+                        help="Also write KPIs aggregated per time bucket and Description")
+    parser.add_argument("--time-column", default=TIME_COLUMN,
+                        help=f"Timestamp column used for --rollup (default: {TIME_COLUMN})")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help=f"Worker processes for multiple files (default: CPU count, {default_workers()} here)")
+    parser.add_argument("--backend", choices=["auto"] + BACKENDS, default=None,
+                        help="KPI compute backend (default: $OEE_BACKEND, else auto by rows per file/chunk)")
+    parser.add_argument("--part-master", default=None,
+                        help=f"Table of Part Number and Ideal Cycle Time; fills Ideal Cycle Time for rows that only carry "
+                             f"a Part Number (default: ${PART_MASTER_ENV})")
+    parser.add_argument("--fleet-output", default=None,
+                        help="Also write one table with the KPIs per input file plus a fleet total row "
+                             "(format from the extension: .csv, .csv.gz, .parquet or .feather)")
+    return parser
+
+
+def output_path(path, output_dir, fmt, suffix="kpis"):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(output_dir or os.path.dirname(os.path.abspath(path)), f"{stem}_{suffix}.{fmt}")
+
+
+def process_file(path, out_path, fmt="csv", oee_only=False, chunksize=CHUNK_SIZE, rollup=None,
+                 time_column=TIME_COLUMN, rollup_path=None, backend=None, part_master=None, reject_path=None):
+    # Runs in a worker process; returns only the small fleet totals, the number of rejected rows and the part
+    # numbers not in the part master, so nothing large is pickled back. Rows failing validation (including rows
+    # of unknown parts, which have no Ideal Cycle Time) are written to reject_path, only when there are any.
+    compute = calculate_oee if oee_only else calculate_kpis
+    sums = None
+    rejected = 0
+    unknown = {}
+    # A rejects file left by an earlier run would otherwise outlive a now-clean input
+    if reject_path and os.path.exists(reject_path):
+        os.remove(reject_path)
+    if fmt == "csv" and not oee_only:
+        # CSV output streams chunk by chunk (CSV chunks, Parquet row groups, Arrow batches) so memory stays flat
+        totals = None
+        parts = []
+        reject_out = None
+
+        def write_rejects(rejects):
+            nonlocal rejected, reject_out
+            if reject_out is None:
+                reject_out = open(reject_path, "w", newline="")
+            rejects.to_csv(reject_out, index=False, header=not rejected)
+            rejected += len(rejects)
+
+        def note_unknown(parts):
+            unknown.update(dict.fromkeys(parts))
+
+        try:
+            with open(out_path, "w", newline="") as out:
+                for chunk, totals in calculate_kpis_streaming(path, chunksize=chunksize, reject_sink=write_rejects,
+                                                              backend=backend, part_master=part_master,
+                                                              unknown_sink=note_unknown):
+                    chunk.to_csv(out, index=False, header=out.tell() == 0)
+                    if rollup:
+                        parts.append(rollup_sums(chunk, rollup, time_column))
+        except Exception:
+            # Don't leave partial result files behind for a failed input
+            os.remove(out_path)
+            if reject_out is not None:
+                reject_out.close()
+                os.remove(reject_path)
+            raise
+        if reject_out is not None:
+            reject_out.close()
+        totals = totals or new_totals()
+        sums = combine_rollups(parts)
+    else:
+        df, unlisted = apply_part_master(read_table(path), part_master)
+        unknown.update(dict.fromkeys(unlisted))
+        missing = missing_columns(df)
+        if missing:
+            raise ValueError(f"missing required columns: {', '.join(missing)}")
+        df, rejects, _ = validate_rows(df)
+        rejected = len(rejects)
+        if rejected:
+            write_table(rejects, reject_path, fmt)
+        results = compute(df, backend)
+        write_table(results, out_path, fmt)
+        totals = accumulate_totals(new_totals(), results)
+        if rollup:
+            sums = rollup_sums(results, rollup, time_column)
+
+    if sums is not None:
+        write_table(kpis_from_sums(sums).reset_index(), rollup_path, fmt)
+    return totals, rejected, list(unknown)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.fleet_output:
+        # Checked before any file is processed rather than failing once all the work is done
+        try:
+            fleet_format = output_format(args.fleet_output)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    # After --output-dir is created, so the fleet table can be written inside it
+    if args.fleet_output and not os.path.isdir(os.path.dirname(os.path.abspath(args.fleet_output))):
+        parser.error(f"directory for --fleet-output does not exist: {args.fleet_output}")
+    # Indexed once here and shipped to the workers with each job; it is small next to the production data
+    part_master_path = args.part_master or os.environ.get(PART_MASTER_ENV)
+    part_master = load_part_master(part_master_path) if part_master_path else None
+
+    jobs = []
+    for path in args.inputs:
+        out_path = output_path(path, args.output_dir, args.format)
+        rollup_path = output_path(path, args.output_dir, args.format, f"{args.rollup}_rollup") if args.rollup else None
+        reject_path = output_path(path, args.output_dir, args.format, "rejects")
+        jobs.append((path, (path, out_path, args.format, args.oee_only, args.chunksize, args.rollup, args.time_column,
+                            rollup_path, args.backend, part_master, reject_path)))
+
+    failed = 0
+    totals_by_source = {}
+    for (path, (_, out_path, *_rest, reject_path)), (_, result, error) in zip(jobs, map_files(process_file, jobs,
+                                                                                               args.workers)):
+        if error is not None:
+            failed += 1
+            print(f"{path}: error: {error}", file=sys.stderr)
+            continue
+        totals, rejected, unknown = result
+        totals_by_source[path] = totals
+        print(f"{path}: {totals['Records']} records -> {out_path}", file=sys.stderr)
+        if rejected:
+            print(f"{path}: {rejected} records failed validation and were excluded -> {reject_path}", file=sys.stderr)
+        if unknown:
+            print(f"{path}: {len(unknown)} part numbers not in the part master: {', '.join(unknown[:10])}"
+                  f"{' ...' if len(unknown) > 10 else ''}", file=sys.stderr)
+
+    fleet = new_totals()
+    for totals in totals_by_source.values():
+        for key in fleet:
+            fleet[key] += totals[key]
+    if args.fleet_output and totals_by_source:
+        write_table(fleet_table(totals_by_source), args.fleet_output, fleet_format)
+    if fleet["Records"]:
+        # numpy scalars -> plain Python numbers for JSON
+        print(json.dumps({key: getattr(value, "item", lambda: value)() for key, value in fleet_kpis(fleet).items()}))
+    return 1 if failed else 0
@@ -0,0 +1,68 @@
+# Stand-in production feed for testing the live dashboard without a PLC:
+#   python -m oee_engine.feed csv live_feed.csv     appends records to a CSV for the CSV tail
+#   python -m oee_engine.feed socket                serves newline-delimited JSON on 127.0.0.1:9750
+import argparse
+import csv
+import json
+import os
+import random
+import socketserver
+import sys
+import time
+
+from .live import DEFAULT_LIVE_CSV, LIVE_COLUMNS, SOCKET_HOST, SOCKET_PORT, synthetic_record
+
+
+def write_csv_feed(path, rate, machines=5, seed=None):
+    rng = random.Random(seed)
+    new_file = not os.path.exists(path) or not os.path.getsize(path)
+    with open(path, "a", newline="") as f:
+        writer = csv.DictWriter(f, LIVE_COLUMNS)
+        if new_file:
+            writer.writeheader()
+        while True:
+            writer.writerow(synthetic_record(rng, machines))
+            f.flush()
+            time.sleep(1 / rate)
+
+
+def serve_socket_feed(host, port, rate, machines=5, seed=None):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            rng = random.Random(seed)
+            try:
+                while True:
+                    self.wfile.write(json.dumps(synthetic_record(rng, machines)).encode("utf-8") + b"\n")
+                    time.sleep(1 / rate)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    with socketserver.ThreadingTCPServer((host, port), Handler) as server:
+        print(f"Serving synthetic production records on {host}:{port}", file=sys.stderr)
+        server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="oee_engine.feed",
+                                     description="Synthetic production feed for testing the live dashboard.")
+    parser.add_argument("mode", choices=["csv", "socket"], help="Append to a CSV file or serve JSON lines over TCP")
+    parser.add_argument("path", nargs="?", default=DEFAULT_LIVE_CSV, help="CSV file to append to (csv mode)")
+    parser.add_argument("--host", default=SOCKET_HOST)
+    parser.add_argument("--port", type=int, default=SOCKET_PORT)
+    parser.add_argument("--rate", type=float, default=20.0, help="Records per second (default: 20)")
+    parser.add_argument("--machines", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    try:
+        if args.mode == "csv":
+            write_csv_feed(args.path, args.rate, args.machines, args.seed)
+        else:
+            serve_socket_feed(args.host, args.port, args.rate, args.machines, args.seed)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
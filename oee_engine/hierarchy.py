@@ -0,0 +1,69 @@
+# Plant > line > machine drill-down. The records are summed per machine once per dataset; the cube then holds
+# the summed times and counts at every level of the hierarchy, so a drill-down step only derives KPIs from the
+# few stored sums below the selected node instead of re-aggregating the records.
+from .kpis import fleet_kpis
+from .rollup import GROUP_COLUMN, kpis_from_sums, sum_frame
+
+HIERARCHY_LEVELS = ["Plant", "Line", GROUP_COLUMN]
+UNASSIGNED = "(unassigned)"
+
+
+def machine_sums(df, group_column=GROUP_COLUMN):
+    # The only pass over the records; everything above the machine level is built from these
+    if group_column not in df.columns:
+        raise ValueError(f"The hierarchy needs a '{group_column}' column to map records to machines")
+    sums = sum_frame(df).groupby(df[group_column], sort=False, observed=True).sum()
+    # Machine names are matched to the mapping as text, after grouping so only the distinct names are converted
+    sums.index = sums.index.astype(str)
+    return sums.groupby(level=0, sort=True).sum()
+
+
+def read_hierarchy(mapping, levels=HIERARCHY_LEVELS):
+    # One row per machine with its parents; a machine mapped under two different parents is ambiguous
+    missing = [col for col in levels if col not in mapping.columns]
+    if missing:
+        raise ValueError(f"Hierarchy mapping is missing {', '.join(missing)}")
+    machine = levels[-1]
+    mapping = mapping.dropna(subset=[machine])[levels].fillna(UNASSIGNED).astype(str).drop_duplicates()
+    conflicts = mapping.loc[mapping[machine].duplicated(), machine]
+    if len(conflicts):
+        raise ValueError(f"Machines mapped to more than one {levels[-2]}: {', '.join(conflicts.unique()[:5])}")
+    return mapping.reset_index(drop=True)
+
+
+class KPICube:
+    def __init__(self, sums, mapping, levels=HIERARCHY_LEVELS):
+        # sums: per-machine sums from machine_sums; mapping: a frame accepted by read_hierarchy
+        import pandas as pd
+
+        self.levels = list(levels)
+        machine = self.levels[-1]
+        parents = read_hierarchy(mapping, self.levels).set_index(machine).reindex(sums.index)
+        self.unassigned = int(parents.isna().any(axis=1).sum())
+        parents = parents.fillna(UNASSIGNED)
+        leaves = sums.set_axis(pd.MultiIndex.from_arrays(
+            [parents[level].to_numpy() for level in self.levels[:-1]] + [sums.index.astype(str)], names=self.levels))
+        self.total = leaves.sum()
+        # depth -> sums per node at that depth, indexed by the node's path from the top
+        self.sums = {len(self.levels): leaves.sort_index()}
+        for depth in range(len(self.levels) - 1, 0, -1):
+            self.sums[depth] = leaves.groupby(level=self.levels[:depth], sort=True).sum()
+
+    def paths(self, depth):
+        # Node paths at a depth (1 = plants), as tuples
+        index = self.sums[depth].index
+        return [key if isinstance(key, tuple) else (key,) for key in index]
+
+    def node(self, path=()):
+        # Fleet-style KPIs for one node; the empty path is the whole dataset
+        return fleet_kpis(self.total if not path else self.sums[len(path)].loc[tuple(path) if len(path) > 1 else path[0]])
+
+    def children(self, path=()):
+        # One row of sums and KPIs per node directly below path
+        import numpy as np
+
+        level = self.sums[len(path) + 1]
+        mask = np.ones(len(level), dtype=bool)
+        for i, key in enumerate(path):
+            mask &= level.index.get_level_values(i) == key
+        return kpis_from_sums(level[mask]).reset_index()
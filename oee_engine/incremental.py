@@ -0,0 +1,140 @@
+# Incremental append mode: keep computed results for a session and only run the KPIs on rows
+# that were not seen in an earlier upload.
+import hashlib
+import io
+
+from .kpis import REQUIRED_COLUMNS, calculate_kpis, missing_columns
+from .parts import apply_part_master, part_keys
+from .rollup import BUCKETS, TIME_COLUMN, combine_rollups, kpis_from_sums, rollup_sums
+from .tables import INPUT_COLUMNS, read_table
+from .validate import validate_rows
+
+
+def key_frame(df, columns):
+    # The values that get hashed, normalised so a row hashes the same whatever dtypes its file happened to
+    # infer (one 2.5 turns a whole int column into floats): inputs as float64, timestamps as datetimes and
+    # everything else as text, converted once per distinct value
+    import numpy as np
+    import pandas as pd
+
+    keys = {}
+    for col in columns:
+        if col in REQUIRED_COLUMNS:
+            keys[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float64)
+        elif col == TIME_COLUMN:
+            keys[col] = pd.to_datetime(df[col], errors="coerce")
+        else:
+            codes, uniques = pd.factorize(df[col])
+            keys[col] = np.append(part_keys(uniques).to_numpy(dtype=object), "")[codes]
+    return pd.DataFrame(keys, index=df.index)
+
+
+def row_fingerprints(df, key_columns=None):
+    # uint64 hash per row of the key columns, or of all input columns when no key is configured
+    import pandas as pd
+
+    columns = key_columns or [col for col in INPUT_COLUMNS if col in df.columns]
+    return pd.util.hash_pandas_object(key_frame(df, columns), index=False).to_numpy()
+
+
+class IncrementalKPIs:
+    def __init__(self, key_columns=None, time_column=TIME_COLUMN, part_master=None, backend=None):
+        import numpy as np
+
+        self.key_columns = key_columns
+        self.time_column = time_column
+        self.part_master = part_master
+        self.backend = backend
+        self.parts = []
+        self.reject_parts = []
+        self.unknown_parts = {}   # part numbers not in the part master, in first-seen order
+        self.fingerprints = np.empty(0, dtype=np.uint64)   # sorted
+        self.rollups = {}
+        self.rows = 0
+        self.rejected = 0
+        self.last_delta = 0
+        self.last_rejected = 0
+        self._results = None
+        self._prefix = None   # (length, sha256) of the last CSV upload, for the append-only fast path
+
+    def is_new(self, fingerprints):
+        import numpy as np
+
+        if not len(self.fingerprints):
+            return np.ones(len(fingerprints), dtype=bool)
+        pos = np.searchsorted(self.fingerprints, fingerprints).clip(max=len(self.fingerprints) - 1)
+        return self.fingerprints[pos] != fingerprints
+
+    def update(self, df):
+        import numpy as np
+        import pandas as pd
+
+        df, unknown = apply_part_master(df, self.part_master)
+        missing = missing_columns(df) + [col for col in self.key_columns or [] if col not in df.columns]
+        if missing:
+            raise ValueError(f"Input is missing required columns: {', '.join(missing)}")
+        self.unknown_parts.update(dict.fromkeys(unknown))
+
+        fingerprints = row_fingerprints(df, self.key_columns)
+        new = self.is_new(fingerprints)
+        # Repeated rows inside one upload count once, like repeats across uploads
+        new &= ~pd.Series(fingerprints).duplicated().to_numpy()
+        clean, rejects, _ = validate_rows(df[new].copy())
+        delta = calculate_kpis(clean, self.backend)
+        self.last_delta = len(delta)
+        self.last_rejected = len(rejects)
+        if not new.any():
+            return delta
+
+        # Rejected rows are remembered as seen too, so a bad row is reported once rather than on every upload.
+        # Both runs are sorted, so the stable (merge) sort is close to linear
+        self.fingerprints = np.sort(np.concatenate([self.fingerprints, np.sort(fingerprints[new])]), kind="stable")
+        if len(rejects):
+            self.reject_parts.append(rejects)
+            self.rejected += len(rejects)
+        if not len(delta):
+            return delta
+        self.parts.append(delta)
+        self.rows += len(delta)
+        self._results = None
+        if self.time_column in delta.columns:
+            for bucket in BUCKETS:
+                self.rollups[bucket] = combine_rollups([self.rollups.get(bucket),
+                                                        rollup_sums(delta, bucket, self.time_column)])
+        return delta
+
+    def update_bytes(self, data, fmt="csv"):
+        # When a CSV upload is the previous upload plus appended lines, only the new tail is parsed
+        prefix = self._prefix
+        current = (len(data), hashlib.sha256(data).digest()) if fmt == "csv" else None
+        if current is not None and current == prefix:
+            self.last_delta = self.last_rejected = 0
+            return None
+        # Key columns are read even when they are nothing the KPIs need
+        columns = INPUT_COLUMNS + [col for col in self.key_columns or [] if col not in INPUT_COLUMNS]
+        if (fmt == "csv" and prefix and len(data) > prefix[0] and data[prefix[0] - 1:prefix[0]] == b"\n"
+                and hashlib.sha256(data[:prefix[0]]).digest() == prefix[1]):
+            header = data[:data.index(b"\n") + 1]
+            delta = self.update(read_table(io.BytesIO(header + data[prefix[0]:]), fmt, columns=columns))
+        else:
+            delta = self.update(read_table(io.BytesIO(data), fmt, columns=columns))
+        # Only remembered once the upload went through, so a failed upload is retried instead of skipped
+        self._prefix = current
+        return delta
+
+    def results(self):
+        import pandas as pd
+
+        if self._results is None:
+            self._results = pd.concat(self.parts, ignore_index=True) if self.parts else None
+        return self._results
+
+    def rejects(self):
+        import pandas as pd
+
+        return pd.concat(self.reject_parts, ignore_index=True) if self.reject_parts else None
+
+    def rollup_kpis(self, bucket):
+        sums = self.rollups.get(bucket)
+        return None if sums is None else kpis_from_sums(sums).reset_index()
+
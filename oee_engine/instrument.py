@@ -0,0 +1,151 @@
+# Per-stage timing and memory sampling. When disabled, stage() hands back one shared no-op
+# context manager, so instrumented code pays only a method call.
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger("oee_engine.stages")
+
+_DISABLED = contextlib.nullcontext()
+_END = object()
+# tracemalloc is process-wide. It is switched on while any timer has a stage open and off again when the last one
+# closes (unless something else had started it), so an interrupted script run can't leave it tracing for good.
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if not _tracing_users:
+            _tracing_started = not tracemalloc.is_tracing()
+            if _tracing_started:
+                tracemalloc.start()
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users -= 1
+        if not _tracing_users and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+def rss_bytes():
+    # Current resident set size; falls back to the peak RSS where /proc is unavailable
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StageTimer:
+    def __init__(self, enabled=False, trace_memory=True):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.records = []
+        self._by_stage = {}
+        # One entry per open stage: the highest traced size seen so far inside it. Every stage resets the
+        # tracemalloc peak on entry, so it first folds the current peak into its parent, and hands its own peak
+        # up on exit; an outer stage still reports the peak of everything it ran.
+        self._open_peaks = []
+        self._depth = 0
+
+    def stage(self, name):
+        if not self.enabled:
+            return _DISABLED
+        return self._measure(name)
+
+    def iterate(self, name, iterable):
+        # Times fetching each item (e.g. parsing the next chunk) as one repeated stage
+        if not self.enabled:
+            return iterable
+        return self._iterate(name, iterable)
+
+    def _iterate(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            with self._measure(name):
+                item = next(iterator, _END)
+            if item is _END:
+                return
+            yield item
+
+    @contextlib.contextmanager
+    def _measure(self, name):
+        if self.trace_memory and not self._depth:
+            _acquire_tracing()
+        depth = self._depth
+        self._depth += 1
+        tracing = self.trace_memory
+        if tracing:
+            traced_before, peak = tracemalloc.get_traced_memory()
+            if self._open_peaks:
+                self._open_peaks[-1] = max(self._open_peaks[-1], peak)
+            tracemalloc.reset_peak()
+            self._open_peaks.append(traced_before)
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            record = {
+                "stage": name,
+                "depth": depth,
+                "seconds": seconds,
+                "rss_bytes": rss_bytes(),
+                "rss_delta_bytes": rss_bytes() - rss_before,
+            }
+            if tracing:
+                peak = max(self._open_peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if self._open_peaks:
+                    self._open_peaks[-1] = max(self._open_peaks[-1], peak)
+                record["peak_alloc_bytes"] = peak - traced_before
+            self._depth -= 1
+            if tracing and not self._depth:
+                _release_tracing()
+            self._add(record)
+
+    def _add(self, record):
+        # A stage that runs repeatedly (once per chunk, say) is one record: times and RSS growth add up, the
+        # memory peak is the highest of any call
+        record = {**record, "calls": record.get("calls", 1)}
+        previous = self._by_stage.get(record["stage"])
+        if previous is None:
+            self._by_stage[record["stage"]] = record
+            self.records.append(record)
+            return
+        previous["seconds"] += record["seconds"]
+        previous["rss_bytes"] = record["rss_bytes"]
+        previous["rss_delta_bytes"] += record["rss_delta_bytes"]
+        if "peak_alloc_bytes" in record:
+            previous["peak_alloc_bytes"] = max(previous.get("peak_alloc_bytes", 0), record["peak_alloc_bytes"])
+        previous["calls"] += record["calls"]
+
+    def extend(self, records, prefix=""):
+        # Records measured elsewhere, e.g. returned by a worker process; they nest under the stages open here
+        for record in records:
+            self._add({**record, "stage": prefix + record["stage"], "depth": record["depth"] + self._depth})
+
+    def total_seconds(self):
+        # Nested stages are already inside their parent's time
+        return sum(record["seconds"] for record in self.records if not record["depth"])
+
+    def to_json(self, **meta):
+        return json.dumps({**meta, "stages": self.records}, indent=2)
+
+    def log(self, level=logging.INFO):
+        # One key=value line per stage for log-based monitoring
+        for record in self.records:
+            logger.log(level, " ".join(f"{key}={value}" for key, value in record.items()))
@@ -0,0 +1,129 @@
+# Pure KPI formulas shared by the Streamlit apps and the batch CLI.
+# Nothing in this package may import streamlit or plotly.
+
+REQUIRED_COLUMNS = ["Planned Production Time", "Downtime", "Total Count", "Good Count", "Ideal Cycle Time"]
+TOTAL_COLUMNS = ["Planned Production Time", "Downtime", "Total Count", "Good Count", "Ideal Time", "Planned Output"]
+CHUNK_SIZE = 100_000
+
+
+def missing_columns(df):
+    return [col for col in REQUIRED_COLUMNS if col not in df.columns]
+
+
+# Every derived column as a formula over a column getter. Inputs that are themselves derived
+# resolve recursively, so any single KPI can be computed on demand from the base columns.
+KPI_FORMULAS = {
+    "Run Time": lambda c: c("Planned Production Time") - c("Downtime"),
+    "Ideal Time": lambda c: c("Ideal Cycle Time") * c("Total Count"),
+    "Availability": lambda c: c("Run Time") / c("Planned Production Time"),
+    "Performance": lambda c: c("Ideal Time") / c("Run Time"),
+    "Quality": lambda c: c("Good Count") / c("Total Count"),
+    "OEE": lambda c: c("Availability") * c("Performance") * c("Quality"),
+    "Scrap Count": lambda c: c("Total Count") - c("Good Count"),
+    "Scrap Rate (%)": lambda c: (c("Scrap Count") / c("Total Count")) * 100,
+    "Planned Output": lambda c: c("Planned Production Time") / c("Ideal Cycle Time"),
+    "Yield vs. Planned Output (%)": lambda c: (c("Good Count") / c("Planned Output")) * 100,
+}
+OEE_COLUMNS = ["Run Time", "Availability", "Performance", "Quality", "OEE"]
+KPI_COLUMNS = OEE_COLUMNS + ["Scrap Count", "Scrap Rate (%)", "Planned Output", "Yield vs. Planned Output (%)"]
+
+
+def evaluate_formulas(names, getter, columns):
+    # Columns already in `columns` are read through getter as-is; anything else is computed once per call.
+    # The getter decides the array type (pandas Series, NumPy arrays, Polars expressions, ...).
+    computed = {}
+
+    def column(col):
+        if col in columns:
+            return getter(col)
+        if col not in computed:
+            if col not in KPI_FORMULAS:
+                raise KeyError(col)
+            computed[col] = KPI_FORMULAS[col](column)
+        return computed[col]
+
+    return {name: column(name) for name in names}
+
+
+def derive(data, name):
+    return evaluate_formulas([name], data.__getitem__, data)[name]
+
+
+def calculate_oee(df, backend=None):
+    from .backends import compute_columns
+
+    return compute_columns(df, OEE_COLUMNS, backend)
+
+
+def calculate_kpis(df, backend=None):
+    from .backends import compute_columns
+
+    return compute_columns(df, KPI_COLUMNS, backend)
+
+
+def new_totals():
+    return dict.fromkeys(["Records"] + TOTAL_COLUMNS, 0)
+
+
+def accumulate_totals(totals, df):
+    # Running sums of the raw times and counts; fleet KPIs are derived from these, not averaged per row
+    totals["Records"] += len(df)
+    totals["Planned Production Time"] += df["Planned Production Time"].sum()
+    totals["Downtime"] += df["Downtime"].sum()
+    totals["Total Count"] += df["Total Count"].sum()
+    totals["Good Count"] += df["Good Count"].sum()
+    totals["Ideal Time"] += (df["Ideal Cycle Time"] * df["Total Count"]).sum()
+    totals["Planned Output"] += (df["Planned Production Time"] / df["Ideal Cycle Time"]).sum()
+    return totals
+
+
+def fleet_kpis(totals):
+    run_time = totals["Planned Production Time"] - totals["Downtime"]
+    availability = run_time / totals["Planned Production Time"]
+    performance = totals["Ideal Time"] / run_time
+    quality = totals["Good Count"] / totals["Total Count"]
+    scrap_count = totals["Total Count"] - totals["Good Count"]
+    return {
+        "Records": totals["Records"],
+        "Run Time": run_time,
+        "Availability": availability,
+        "Performance": performance,
+        "Quality": quality,
+        "OEE": availability * performance * quality,
+        "Scrap Count": scrap_count,
+        "Scrap Rate (%)": (scrap_count / totals["Total Count"]) * 100,
+        "Yield vs. Planned Output (%)": (totals["Good Count"] / totals["Planned Output"]) * 100,
+    }
+
+
+def calculate_kpis_streaming(source, chunksize=CHUNK_SIZE, fmt=None, reject_sink=None, backend=None, part_master=None,
+                             unknown_sink=None, timer=None):
+    # Yields (chunk results, running totals) so only one chunk is held in memory at a time.
+    # With reject_sink, each chunk is validated first and its rejected rows are passed to reject_sink.
+    # With part_master, Ideal Cycle Time is filled in by part number before anything else, and each chunk's
+    # part numbers that are not in the master are passed to unknown_sink.
+    # With timer, each step is a stage summed over the chunks.
+    from .instrument import StageTimer
+    from .parts import apply_part_master
+    from .tables import iter_table_chunks
+    from .validate import validate_rows
+
+    timer = timer or StageTimer()
+    totals = new_totals()
+    for chunk in timer.iterate("read_chunk", iter_table_chunks(source, fmt, chunksize)):
+        with timer.stage("part_master"):
+            chunk, unknown = apply_part_master(chunk, part_master)
+        if unknown and unknown_sink is not None:
+            unknown_sink(unknown)
+        missing = missing_columns(chunk)
+        if missing:
+            raise ValueError(f"Input is missing required columns: {', '.join(missing)}")
+        if reject_sink is not None:
+            with timer.stage("validate"):
+                chunk, rejects, _ = validate_rows(chunk)
+            if len(rejects):
+                reject_sink(rejects)
+        with timer.stage("calculate_kpis"):
+            chunk = calculate_kpis(chunk, backend)
+            accumulate_totals(totals, chunk)
+        yield chunk, totals
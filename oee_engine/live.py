@@ -0,0 +1,191 @@
+# Live rolling-window KPIs. Feeds are polled without blocking and return whatever records arrived since the
+# last poll; RollingOEE keeps the last N records in a ring buffer with running sums, so each record costs O(1).
+import csv
+import json
+import os
+import random
+import socket
+import time
+
+from .kpis import REQUIRED_COLUMNS, TOTAL_COLUMNS, fleet_kpis
+from .rollup import GROUP_COLUMN, TIME_COLUMN
+
+ROLLING_WINDOW = 500
+SOCKET_HOST = "127.0.0.1"
+SOCKET_PORT = 9750
+DEFAULT_LIVE_CSV = "live_feed.csv"
+# Where the dashboard's feeds read from is set by whoever runs it
+LIVE_CSV_ENV = "OEE_LIVE_CSV"
+LIVE_HOST_ENV = "OEE_LIVE_HOST"
+LIVE_PORT_ENV = "OEE_LIVE_PORT"
+LIVE_COLUMNS = [TIME_COLUMN, GROUP_COLUMN] + REQUIRED_COLUMNS
+
+
+def record_values(record):
+    # One record's contribution to each of TOTAL_COLUMNS, or None if it can't produce finite KPIs
+    try:
+        planned, downtime, total, good, cycle = (float(record[col]) for col in REQUIRED_COLUMNS)
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (planned > 0 and cycle > 0 and 0 <= downtime <= planned and 0 <= good <= total):
+        return None
+    return planned, downtime, total, good, cycle * total, planned / cycle
+
+
+def json_record(line):
+    # A malformed line becomes None, which RollingOEE counts as rejected like any other bad record
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+class RollingOEE:
+    def __init__(self, window=ROLLING_WINDOW):
+        import numpy as np
+
+        self.window = window
+        self.ring = np.zeros((window, len(TOTAL_COLUMNS)))
+        self.sums = np.zeros(len(TOTAL_COLUMNS))
+        self.pos = 0
+        self.count = 0
+        self.received = 0
+        self.rejected = 0
+        self.last_record = None
+
+    def update(self, record):
+        values = record_values(record)
+        if values is None:
+            self.rejected += 1
+            return
+        self.received += 1
+        self.last_record = record
+        # Subtract the record falling out of the window, add the new one
+        self.sums += values
+        self.sums -= self.ring[self.pos]
+        self.ring[self.pos] = values
+        self.pos = (self.pos + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+        if self.pos == 0:
+            # Once per lap, so float drift from the running add/subtract can't accumulate
+            self.sums = self.ring.sum(axis=0)
+
+    def extend(self, records):
+        for record in records:
+            self.update(record)
+        return self
+
+    def totals(self):
+        return {"Records": self.count, **dict(zip(TOTAL_COLUMNS, self.sums.tolist()))}
+
+    def kpis(self):
+        if not self.count:
+            return None
+        return fleet_kpis(self.totals())
+
+
+class CSVTail:
+    # Follows a growing CSV like `tail -f`: each poll returns the complete lines appended since the last poll
+    def __init__(self, path, from_start=False):
+        self.path = path
+        self.from_start = from_start
+        self.header = None
+        self.offset = 0
+        self.partial = b""
+
+    def poll(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "rb") as f:
+            if self.header is None:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    return []
+                self.header = next(csv.reader([line.decode("utf-8-sig")]))
+                self.offset = f.tell() if self.from_start else os.fstat(f.fileno()).st_size
+            elif os.fstat(f.fileno()).st_size < self.offset:
+                # Truncated or replaced: start over with the new file's header
+                self.header = None
+                self.partial = b""
+                return self.poll()
+            f.seek(self.offset)
+            data = f.read()
+        self.offset += len(data)
+        lines = (self.partial + data).split(b"\n")
+        self.partial = lines.pop()
+        rows = csv.reader(line.decode("utf-8", errors="replace") for line in lines if line.strip())
+        return [dict(zip(self.header, row)) for row in rows]
+
+    def close(self):
+        pass
+
+
+class SocketFeed:
+    # Newline-delimited JSON records from a local TCP feed; reconnects on the next poll if the feed drops
+    def __init__(self, host=SOCKET_HOST, port=SOCKET_PORT):
+        self.host = host
+        self.port = port
+        self.sock = None
+        self.partial = b""
+
+    def poll(self):
+        if self.sock is None:
+            self.sock = socket.create_connection((self.host, self.port), timeout=1)
+            self.sock.setblocking(False)
+            self.partial = b""
+        chunks = []
+        while True:
+            try:
+                chunk = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            if not chunk:
+                self.close()
+                break
+            chunks.append(chunk)
+        lines = (self.partial + b"".join(chunks)).split(b"\n")
+        self.partial = lines.pop()
+        return [json_record(line) for line in lines if line.strip()]
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+def synthetic_record(rng, machines=5, interval=1.0):
+    # One production report per machine and interval (minutes), shaped like the upload columns
+    machine = rng.randrange(machines)
+    downtime = round(min(rng.expovariate(1 / (0.05 * interval)), interval), 3) if rng.random() < 0.3 else 0.0
+    cycle = round(0.02 + 0.005 * machine, 3)
+    total = int((interval - downtime) / cycle * rng.uniform(0.75, 1.0))
+    return {
+        TIME_COLUMN: time.strftime("%Y-%m-%d %H:%M:%S"),
+        GROUP_COLUMN: f"Machine {machine}",
+        "Planned Production Time": interval,
+        "Downtime": downtime,
+        "Total Count": total,
+        "Good Count": total - round(total * rng.uniform(0, 0.04)),
+        "Ideal Cycle Time": cycle,
+    }
+
+
+class SyntheticFeed:
+    # In-process stand-in for a real feed: emits `rate` records per second of wall time between polls
+    def __init__(self, rate=20.0, machines=5, seed=None):
+        self.rate = rate
+        self.machines = machines
+        self.rng = random.Random(seed)
+        self.last = time.monotonic()
+        self.carry = 0.0
+
+    def poll(self):
+        now = time.monotonic()
+        self.carry += (now - self.last) * self.rate
+        self.last = now
+        n = int(self.carry)
+        self.carry -= n
+        return [synthetic_record(self.rng, self.machines) for _ in range(n)]
+
+    def close(self):
+        pass
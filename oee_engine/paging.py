@@ -0,0 +1,110 @@
+# Server-side paging for large result frames. Sort orders and filter masks are computed once with NumPy and
+# cached on the view, so turning a page is an index slice plus formatting of the visible rows only.
+from .rollup import GROUP_COLUMN
+from .specs import KPI_SPECS
+
+PAGE_SIZE = 50
+PERCENT_SCALES = {spec["column"]: spec["scale"] for spec in KPI_SPECS}
+
+
+def sort_keys(values):
+    # Numeric sort keys with missing values as NaN; text is ranked through its sorted unique values
+    import numpy as np
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype=float, na_value=np.nan)
+    codes, _ = pd.factorize(values, sort=True)
+    return np.where(codes < 0, np.nan, codes)
+
+
+class PagedView:
+    def __init__(self, df, text_column=GROUP_COLUMN):
+        self.df = df
+        self.text_column = text_column if text_column in df.columns else None
+        self._orders = {}
+        self._text_codes = None
+        self._mask = (None, None)
+        self._positions = (None, None)
+
+    def order(self, column, ascending=True):
+        # Stable argsort per (column, direction); missing values go last either way
+        import numpy as np
+
+        if column is None:
+            return None
+        if (column, ascending) not in self._orders:
+            keys = sort_keys(self.df[column])
+            self._orders[(column, ascending)] = np.argsort(keys if ascending else -keys, kind="stable")
+        return self._orders[(column, ascending)]
+
+    def _text_mask(self, text):
+        # Substring match on the distinct values only, then one lookup per row through the codes
+        import numpy as np
+        import pandas as pd
+
+        if self._text_codes is None:
+            self._text_codes = pd.factorize(self.df[self.text_column])
+        codes, uniques = self._text_codes
+        hits = pd.Index(uniques).astype(str).str.contains(text, case=False, regex=False)
+        return np.append(np.asarray(hits, dtype=bool), False)[codes]
+
+    def mask(self, text=None, column=None, low=None, high=None):
+        import numpy as np
+
+        key = (text, column, low, high)
+        if self._mask[0] == key:
+            return self._mask[1]
+        mask = None
+        if text and self.text_column:
+            mask = self._text_mask(text)
+        if column is not None and (low is not None or high is not None):
+            values = self.df[column].to_numpy(dtype=float, na_value=np.nan)
+            in_range = np.ones(len(values), dtype=bool)
+            if low is not None:
+                in_range &= values >= low
+            if high is not None:
+                in_range &= values <= high
+            mask = in_range if mask is None else mask & in_range
+        self._mask = (key, mask)
+        return mask
+
+    def positions(self, sort_by=None, ascending=True, **filters):
+        # Row positions in display order, or None for the whole frame in its own order
+        import numpy as np
+
+        key = (sort_by, ascending, tuple(sorted(filters.items())))
+        if self._positions[0] != key:
+            order = self.order(sort_by, ascending)
+            mask = self.mask(**filters)
+            if mask is None:
+                positions = order
+            elif order is None:
+                positions = np.flatnonzero(mask)
+            else:
+                positions = order[mask[order]]
+            self._positions = (key, positions)
+        return self._positions[1]
+
+    def count(self, sort_by=None, ascending=True, **filters):
+        positions = self.positions(sort_by, ascending, **filters)
+        return len(self.df) if positions is None else len(positions)
+
+    def page(self, number, page_size=PAGE_SIZE, columns=None, sort_by=None, ascending=True, **filters):
+        positions = self.positions(sort_by, ascending, **filters)
+        start = number * page_size
+        rows = slice(start, start + page_size) if positions is None else positions[start:start + page_size]
+        cols = slice(None) if columns is None else [self.df.columns.get_loc(col) for col in columns]
+        return self.df.iloc[rows, cols]
+
+
+def format_page(page, scales=PERCENT_SCALES, digits=2):
+    # Percent strings for the visible rows only, instead of a Python call per cell of the whole frame
+    import numpy as np
+
+    page = page.copy()
+    for col, scale in scales.items():
+        if col in page.columns:
+            values = page[col].to_numpy(dtype=float, na_value=np.nan) * scale
+            page[col] = [f"{value:.{digits}f}%" if value == value else "" for value in values]
+    return page
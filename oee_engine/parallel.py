@@ -0,0 +1,102 @@
+# Process-pool fan-out for many input files. Each file is parsed and computed in its own
+# worker; a failing file is reported without stopping the batch.
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .instrument import StageTimer
+from .kpis import accumulate_totals, calculate_kpis, missing_columns, new_totals
+from .parts import apply_part_master
+from .rollup import kpis_from_sums
+from .tables import detect_format, read_table
+from .validate import validate_rows
+
+SOURCE_COLUMN = "Source File"
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def map_files(func, jobs, workers=None):
+    # jobs: list of (name, args tuple). Returns [(name, result, error)] in input order.
+    workers = workers or default_workers()
+    outcomes = [None] * len(jobs)
+    if workers == 1 or len(jobs) == 1:
+        for i, (name, args) in enumerate(jobs):
+            try:
+                outcomes[i] = (name, func(*args), None)
+            except Exception as e:
+                outcomes[i] = (name, None, e)
+        return outcomes
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = {pool.submit(func, *args): i for i, (name, args) in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                outcomes[i] = (jobs[i][0], future.result(), None)
+            except Exception as e:
+                outcomes[i] = (jobs[i][0], None, e)
+    return outcomes
+
+
+def compute_source(name, source, fmt=None, part_master=None, timed=False, backend=None):
+    # source is a local path or the raw bytes of an upload. Returns (results, rejected rows, part numbers not in the
+    # part master, stage records); rows of unknown parts have no Ideal Cycle Time and end up in the rejects.
+    # The stage records are only filled in when timed, and are measured in whichever process ran the file.
+    timer = StageTimer(enabled=timed)
+    fmt = detect_format(name, fmt)
+    with timer.stage("read"):
+        df = read_table(io.BytesIO(source) if isinstance(source, bytes) else source, fmt)
+    with timer.stage("part_master"):
+        df, unknown = apply_part_master(df, part_master)
+    missing = missing_columns(df)
+    if missing:
+        raise ValueError(f"missing required columns: {', '.join(missing)}")
+    with timer.stage("validate"):
+        df, rejects, _ = validate_rows(df)
+    with timer.stage("calculate_kpis"):
+        results = calculate_kpis(df, backend)
+    results.insert(0, SOURCE_COLUMN, name)
+    rejects.insert(0, SOURCE_COLUMN, name)
+    return results, rejects, unknown, timer.records
+
+
+def process_sources(sources, workers=None, fmt=None, part_master=None, timer=None, backend=None):
+    # sources: list of (name, path or bytes). Returns (combined results, {name: error message}, combined rejects,
+    # {name: part numbers not in the part master}). With an enabled timer, each file's stages are added to it.
+    import pandas as pd
+
+    timed = timer is not None and timer.enabled
+    outcomes = map_files(compute_source, [(name, (name, source, fmt, part_master, timed, backend))
+                                          for name, source in sources], workers)
+    frames = [result for _, result, error in outcomes if error is None]
+    errors = {name: str(error) for name, _, error in outcomes if error is not None}
+    combined = pd.concat([results for results, *_ in frames], ignore_index=True) if frames else None
+    rejects = pd.concat([rejects for _, rejects, *_ in frames], ignore_index=True) if frames else None
+    unknown = {name: result[2] for name, result, error in outcomes if error is None and result[2]}
+    if timed:
+        for name, result, error in outcomes:
+            if error is None:
+                timer.extend(result[3], f"{name}: ")
+    return combined, errors, rejects, unknown
+
+
+def fleet_table(totals_by_source):
+    # One row of KPIs per source plus a fleet row, all derived from summed times and counts
+    import pandas as pd
+
+    fleet = new_totals()
+    for totals in totals_by_source.values():
+        for key in fleet:
+            fleet[key] += totals[key]
+    sums = pd.DataFrame.from_dict({**totals_by_source, "Fleet": fleet}, orient="index")
+    sums.index.name = SOURCE_COLUMN
+    return kpis_from_sums(sums).reset_index()
+
+
+def source_totals(results):
+    # Per-source totals of a combined results frame
+    return {name: accumulate_totals(new_totals(), group)
+            for name, group in results.groupby(SOURCE_COLUMN, sort=False)}
@@ -0,0 +1,72 @@
+# Part-master lookup: production rows carry a part number and the Ideal Cycle Time comes from a master table
+# indexed by part number. Each distinct part in a file is looked up once and the times are broadcast back to
+# the rows through the factorized codes, so a join costs one hash lookup per distinct part, not per row.
+PART_COLUMN = "Part Number"
+CYCLE_COLUMN = "Ideal Cycle Time"
+PART_MASTER_COLUMNS = [PART_COLUMN, CYCLE_COLUMN]
+PART_MASTER_ENV = "OEE_PART_MASTER"
+
+
+def part_keys(values):
+    # Part numbers compare as text; whole-number floats (an int column with gaps) lose their ".0" first
+    import pandas as pd
+
+    values = pd.Series(values)
+    if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+        values = values.astype("Int64")
+    return values.astype(str).str.strip()
+
+
+def read_part_master(df):
+    # Series of Ideal Cycle Time indexed by part number; a part listed twice with different times is ambiguous
+    import pandas as pd
+
+    missing = [col for col in PART_MASTER_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Part master is missing {', '.join(missing)}")
+    df = df.dropna(subset=[PART_COLUMN])
+    master = pd.Series(pd.to_numeric(df[CYCLE_COLUMN], errors="coerce").to_numpy(), index=part_keys(df[PART_COLUMN]).to_numpy(),
+                       name=CYCLE_COLUMN).dropna()
+    duplicated = master.index.duplicated(keep=False)
+    conflicts = master[duplicated].groupby(level=0).nunique()
+    conflicts = conflicts[conflicts > 1]
+    if len(conflicts):
+        raise ValueError(f"Parts listed with more than one {CYCLE_COLUMN}: {', '.join(conflicts.index[:5])}")
+    master = master[~master.index.duplicated()].sort_index()
+    master.index.name = PART_COLUMN
+    return master
+
+
+def load_part_master(source, fmt=None):
+    from .tables import read_table
+
+    return read_part_master(read_table(source, fmt, columns=PART_MASTER_COLUMNS))
+
+
+def _lookup(df, master):
+    # Per-row master times (NaN for unknown or missing part numbers) and the distinct part numbers not found
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(df[PART_COLUMN])
+    keys = part_keys(uniques)
+    positions = master.index.get_indexer(keys)
+    found = positions >= 0
+    times = np.append(np.where(found, master.to_numpy()[positions], np.nan), np.nan)
+    return times[codes], keys[~found].tolist()
+
+
+def apply_part_master(df, master):
+    # Fills Ideal Cycle Time by part number in place and returns (df, part numbers not in the master);
+    # a time already on the row wins over the master
+    import numpy as np
+    import pandas as pd
+
+    if master is None or PART_COLUMN not in df.columns:
+        return df, []
+    times, unknown = _lookup(df, master)
+    if CYCLE_COLUMN in df.columns:
+        existing = pd.to_numeric(df[CYCLE_COLUMN], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        times = np.where(np.isnan(existing), times, existing)
+    df[CYCLE_COLUMN] = times
+    return df, unknown
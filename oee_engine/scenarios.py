@@ -0,0 +1,120 @@
+# What-if and Monte Carlo scenarios. Each scenario scales three loss drivers per machine: Downtime, speed
+# (output per minute of run time) and scrap. Scenarios x machines are evaluated as batches of NumPy arrays, a block
+# of scenarios at a time; fleet KPIs per scenario come from the summed times and counts through the same
+# KPI_FORMULAS as calculate_kpis.
+from .hierarchy import machine_sums
+from .kpis import TOTAL_COLUMNS, evaluate_formulas
+from .rollup import GROUP_COLUMN, sum_frame
+
+LOSS_FACTORS = {"Downtime": "Availability (downtime)", "Speed": "Performance (speed)", "Scrap": "Quality (scrap)"}
+DISTRIBUTIONS = ["fixed", "uniform", "normal", "triangular"]
+SCENARIO_KPIS = ["Availability", "Performance", "Quality", "OEE", "Scrap Rate (%)", "Yield vs. Planned Output (%)"]
+SCENARIOS = 5_000
+# Scenario x machine cells per block, which bounds the arrays to tens of MB whatever the run size
+BLOCK_CELLS = 1_000_000
+# Percentiles of each factor used for the one-at-a-time sensitivity runs
+LOW_HIGH = (10, 90)
+
+
+def scenario_base(df):
+    # Per-machine sums, or one row for the whole frame when records aren't tied to machines
+    if GROUP_COLUMN in df.columns:
+        return machine_sums(df)
+    return sum_frame(df).sum().to_frame().T
+
+
+def sample_factor(spec, size, rng):
+    # spec: a number (fixed factor) or (distribution, *parameters): ("uniform", low, high),
+    # ("normal", mean, sd) or ("triangular", low, mode, high). Factors are multipliers, clipped at 0.
+    import numpy as np
+
+    if isinstance(spec, (int, float)):
+        return np.full(size, float(spec))
+    kind, *params = spec
+    if kind == "fixed":
+        return np.full(size, float(params[0]))
+    if kind == "uniform":
+        values = rng.uniform(params[0], params[1], size)
+    elif kind == "normal":
+        values = rng.normal(params[0], params[1], size)
+    elif kind == "triangular":
+        if not params[0] <= params[1] <= params[2] or params[0] == params[2]:
+            raise ValueError("A triangular distribution needs low <= mode <= high and low < high")
+        values = rng.triangular(params[0], params[1], params[2], size)
+    else:
+        raise ValueError(f"Unknown distribution '{kind}'; expected one of {', '.join(DISTRIBUTIONS)}")
+    return np.clip(values, 0, None)
+
+
+def scenario_kpis(base, factors):
+    # base: per-machine sums (M rows). factors: {"Downtime", "Speed", "Scrap"} -> arrays broadcastable to (S, M)
+    # or (S, 1); missing factors are 1. Returns {KPI: array of S fleet values}.
+    import numpy as np
+
+    planned = base["Planned Production Time"].to_numpy(dtype=float)
+    downtime = base["Downtime"].to_numpy(dtype=float)
+    total = base["Total Count"].to_numpy(dtype=float)
+    scrap = total - base["Good Count"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Output scales with the extra run time at each machine's current rate, then with the speed factor
+        new_downtime = np.minimum(downtime * factors.get("Downtime", 1.0), planned)
+        run_time = planned - downtime
+        ratio = np.where(run_time > 0, (planned - new_downtime) / run_time, 0.0) * factors.get("Speed", 1.0)
+        new_total = total * ratio
+        new_scrap = np.minimum(scrap * ratio * factors.get("Scrap", 1.0), new_total)
+        totals = {
+            "Planned Production Time": np.broadcast_to(planned.sum(), new_total.shape[:-1]),
+            "Downtime": np.broadcast_to(new_downtime, new_total.shape).sum(axis=-1),
+            "Total Count": new_total.sum(axis=-1),
+            "Good Count": (new_total - new_scrap).sum(axis=-1),
+            "Ideal Time": (base["Ideal Time"].to_numpy(dtype=float) * ratio).sum(axis=-1),
+            "Planned Output": np.broadcast_to(base["Planned Output"].to_numpy(dtype=float).sum(), new_total.shape[:-1]),
+        }
+        return evaluate_formulas(SCENARIO_KPIS, totals.__getitem__, TOTAL_COLUMNS)
+
+
+def simulate(base, specs, scenarios=SCENARIOS, per_machine=False, seed=None):
+    # Returns (one row per scenario with its factors and fleet KPIs, sensitivity ranking, baseline KPIs).
+    # per_machine draws every machine's factors independently; otherwise one draw applies to the whole fleet.
+    import numpy as np
+    import pandas as pd
+
+    # One generator per factor, so the draws don't depend on how the scenarios are split into blocks
+    rngs = [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(len(LOSS_FACTORS))]
+    width = len(base) if per_machine else 1
+    block = max(1, BLOCK_CELLS // width)
+    parts = []
+    levels = None
+    for start in range(0, scenarios, block):
+        shape = (min(block, scenarios - start), width)
+        samples = {name: sample_factor(specs.get(name, 1.0), shape, rng) for name, rng in zip(LOSS_FACTORS, rngs)}
+        if levels is None:
+            # Factor percentiles for the sensitivity runs, from the first block's draws (all of them for most runs)
+            levels = {name: np.percentile(values, [LOW_HIGH[0], 50, LOW_HIGH[1]]) for name, values in samples.items()}
+        parts.append(pd.DataFrame({**{f"{name} factor": values.mean(axis=1) for name, values in samples.items()},
+                                   **scenario_kpis(base, samples)}))
+    results = pd.concat(parts, ignore_index=True)
+
+    # Baseline plus each factor alone at its low, median and high percentile, as one more batch
+    batch = {name: np.ones((1 + 3 * len(levels), 1)) for name in levels}
+    for i, (name, values) in enumerate(levels.items()):
+        batch[name][1 + 3 * i:4 + 3 * i, 0] = values
+    oee = scenario_kpis(base, batch)["OEE"]
+    baseline = {name: float(value) for name, value in scenario_kpis(base, {}).items()}
+    effects = (oee[1:].reshape(len(levels), 3) - oee[0]) * 100
+
+    sensitivity = pd.DataFrame({
+        "Loss": list(LOSS_FACTORS.values()),
+        "Factor": list(levels),
+        f"Factor P{LOW_HIGH[0]}": [values[0] for values in levels.values()],
+        f"Factor P{LOW_HIGH[1]}": [values[2] for values in levels.values()],
+        f"OEE change at P{LOW_HIGH[0]} (pp)": effects[:, 0],
+        "OEE change at median (pp)": effects[:, 1],
+        f"OEE change at P{LOW_HIGH[1]} (pp)": effects[:, 2],
+        # How much of the scenario-to-scenario OEE spread this factor drives (0 when it isn't varied)
+        # (Spearman as Pearson on ranks, which avoids needing SciPy)
+        "Rank correlation with OEE": [results[f"{name} factor"].rank().corr(results["OEE"].rank())
+                                      if results[f"{name} factor"].nunique() > 1 else 0.0 for name in levels],
+    })
+    sensitivity["Impact (pp)"] = np.abs(effects).max(axis=1)
+    return results, sensitivity.sort_values("Impact (pp)", ascending=False, ignore_index=True), baseline
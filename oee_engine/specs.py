@@ -0,0 +1,71 @@
+# One table describing every headline KPI: where its value comes from, its benchmark and
+# alert direction, gauge bands and the operator-facing warning. Gauges, benchmark charts
+# and alerts all read from here.
+
+KPI_SPECS = [
+    {
+        "title": "Availability",
+        "column": "Availability",
+        "scale": 100,
+        "threshold": 90,
+        "reverse": False,
+        "steps": [(0, 70, "#ffcccc"), (70, 90, "#ffe680"), (90, 100, "#ccffcc")],
+        "warning": "⚠️ Availability is below typical benchmark of 90%.",
+    },
+    {
+        "title": "Performance",
+        "column": "Performance",
+        "scale": 100,
+        "threshold": 95,
+        "reverse": False,
+        "steps": [(0, 75, "#ffcccc"), (75, 95, "#ffe680"), (95, 100, "#ccffcc")],
+        "warning": "⚠️ Performance is below typical benchmark of 95%.",
+    },
+    {
+        "title": "Quality",
+        "column": "Quality",
+        "scale": 100,
+        "threshold": 99,
+        "reverse": False,
+        "steps": [(0, 90, "#ffcccc"), (90, 99, "#ffe680"), (99, 100, "#ccffcc")],
+        "warning": "⚠️ Quality is below typical benchmark of 99%.",
+    },
+    {
+        "title": "OEE",
+        "column": "OEE",
+        "scale": 100,
+        "threshold": 85,
+        "reverse": False,
+        "steps": [(0, 70, "#ffcccc"), (70, 85, "#ffe680"), (85, 100, "#ccffcc")],
+        "warning": "⚠️ OEE below world-class standard (85%). Consider investigating downtime, speed losses, or quality issues.",
+    },
+    {
+        "title": "Scrap Rate",
+        "column": "Scrap Rate (%)",
+        "scale": 1,
+        "threshold": 5,
+        "reverse": True,
+        "steps": [(0, 2, "#ccffcc"), (2, 5, "#ffe680"), (5, 100, "#ffcccc")],
+        "warning": "⚠️ Scrap Rate exceeds target of 5%. Investigate defect sources.",
+    },
+    {
+        "title": "Yield vs. Planned Output",
+        "column": "Yield vs. Planned Output (%)",
+        "scale": 1,
+        "threshold": 95,
+        "reverse": False,
+        "steps": [(0, 70, "#ffcccc"), (70, 95, "#ffe680"), (95, 100, "#ccffcc")],
+        "warning": "⚠️ Yield vs. Planned Output is below expected 95%. Review production efficiency.",
+    },
+]
+
+
+def kpi_value(spec, row):
+    return row[spec["column"]] * spec["scale"]
+
+
+def is_alert(spec, value):
+    # reverse=True means higher is worse (e.g. Scrap Rate)
+    if spec["reverse"]:
+        return value > spec["threshold"]
+    return value < spec["threshold"]
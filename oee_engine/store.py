@@ -0,0 +1,115 @@
+# Optional on-disk history of uploaded records and their KPIs (SQLite, stdlib only). Records are indexed by
+# (Description, Timestamp), so "OEE for one line over the last 90 days" is an index range scan plus a
+# SUM per machine instead of re-parsing every file. Re-storing a record that is already there is a no-op.
+import sqlite3
+
+from .incremental import row_fingerprints
+from .kpis import KPI_COLUMNS, REQUIRED_COLUMNS, calculate_kpis
+from .rollup import GROUP_COLUMN, TIME_COLUMN, kpis_from_sums, rollup_kpis
+
+DEFAULT_STORE_PATH = "oee_history.sqlite"
+STORE_PATH_ENV = "OEE_HISTORY_STORE"
+STORE_COLUMNS = [GROUP_COLUMN, TIME_COLUMN] + REQUIRED_COLUMNS + KPI_COLUMNS
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+INSERT_BATCH = 50_000
+SUM_SQL = """COUNT(*) AS "Records",
+    SUM("Planned Production Time") AS "Planned Production Time",
+    SUM("Downtime") AS "Downtime",
+    SUM("Total Count") AS "Total Count",
+    SUM("Good Count") AS "Good Count",
+    SUM("Ideal Cycle Time" * "Total Count") AS "Ideal Time",
+    SUM("Planned Production Time" / "Ideal Cycle Time") AS "Planned Output\""""
+
+
+def _quoted(columns):
+    return ", ".join(f'"{col}"' for col in columns)
+
+
+def _timestamp(value):
+    import pandas as pd
+
+    return pd.Timestamp(value).strftime(TIMESTAMP_FORMAT)
+
+
+class KPIStore:
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(f'"{col}" {"TEXT" if col in (GROUP_COLUMN, TIME_COLUMN) else "REAL"}' for col in STORE_COLUMNS)
+        with self.conn:
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS records (row_hash INTEGER NOT NULL, {columns})")
+            self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS records_row_hash ON records (row_hash)")
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS records_machine_time ON records ("{GROUP_COLUMN}", "{TIME_COLUMN}")')
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS records_time ON records ("{TIME_COLUMN}")')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def append(self, df):
+        # Stores the input columns plus freshly derived KPIs, so compact or partial result frames store the same way
+        import pandas as pd
+
+        missing = [col for col in [GROUP_COLUMN, TIME_COLUMN] + REQUIRED_COLUMNS if col not in df.columns]
+        if missing:
+            raise ValueError(f"The history store needs {', '.join(missing)} on every record")
+        records = calculate_kpis(df[[GROUP_COLUMN, TIME_COLUMN] + REQUIRED_COLUMNS].astype({col: float for col in REQUIRED_COLUMNS}))
+        records[GROUP_COLUMN] = records[GROUP_COLUMN].astype(str)
+        records[TIME_COLUMN] = pd.to_datetime(records[TIME_COLUMN]).dt.strftime(TIMESTAMP_FORMAT)
+        # Hashed from the stored, normalised values, so the same record from another file is recognised
+        hashes = row_fingerprints(records, [GROUP_COLUMN, TIME_COLUMN] + REQUIRED_COLUMNS).view("int64")
+        sql = f"INSERT OR IGNORE INTO records (row_hash, {_quoted(STORE_COLUMNS)}) VALUES ({', '.join('?' * (len(STORE_COLUMNS) + 1))})"
+        before = self.conn.total_changes
+        with self.conn:
+            for start in range(0, len(records), INSERT_BATCH):
+                batch = records.iloc[start:start + INSERT_BATCH]
+                rows = zip(hashes[start:start + INSERT_BATCH].tolist(),
+                           *(batch[col].astype(object).where(batch[col].notna(), None).tolist() for col in STORE_COLUMNS))
+                self.conn.executemany(sql, rows)
+        return self.conn.total_changes - before
+
+    def _where(self, machines=None, start=None, end=None):
+        clauses, params = [], []
+        if machines:
+            clauses.append(f'"{GROUP_COLUMN}" IN ({", ".join("?" * len(machines))})')
+            params.extend(str(machine) for machine in machines)
+        if start is not None:
+            clauses.append(f'"{TIME_COLUMN}" >= ?')
+            params.append(_timestamp(start))
+        if end is not None:
+            clauses.append(f'"{TIME_COLUMN}" < ?')
+            params.append(_timestamp(end))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def machines(self):
+        return [row[0] for row in self.conn.execute(f'SELECT DISTINCT "{GROUP_COLUMN}" FROM records ORDER BY 1')]
+
+    def time_range(self):
+        return self.conn.execute(f'SELECT MIN("{TIME_COLUMN}"), MAX("{TIME_COLUMN}"), COUNT(*) FROM records').fetchone()
+
+    def records(self, machines=None, start=None, end=None, columns=None):
+        import pandas as pd
+
+        columns = columns or STORE_COLUMNS
+        where, params = self._where(machines, start, end)
+        sql = f'SELECT {_quoted(columns)} FROM records{where} ORDER BY "{GROUP_COLUMN}", "{TIME_COLUMN}"'
+        return pd.read_sql_query(sql, self.conn, params=params, parse_dates=[TIME_COLUMN] if TIME_COLUMN in columns else None)
+
+    def summary(self, machines=None, start=None, end=None):
+        # KPIs per machine from summed times and counts, aggregated inside SQLite
+        import pandas as pd
+
+        where, params = self._where(machines, start, end)
+        sql = f'SELECT "{GROUP_COLUMN}", {SUM_SQL} FROM records{where} GROUP BY "{GROUP_COLUMN}" ORDER BY 1'
+        return kpis_from_sums(pd.read_sql_query(sql, self.conn, params=params, index_col=GROUP_COLUMN)).reset_index()
+
+    def trend(self, bucket="day", machines=None, start=None, end=None, by_machine=True):
+        # Only the inputs of the matching rows are read back, then bucketed like uploaded files
+        df = self.records(machines, start, end, [GROUP_COLUMN, TIME_COLUMN] + REQUIRED_COLUMNS)
+        return rollup_kpis(df, bucket, group_column=GROUP_COLUMN if by_machine else None)
@@ -0,0 +1,189 @@
+# File readers and writers for the batch engine. pandas and pyarrow are imported lazily so the CLI starts fast.
+import gzip
+import io
+import os
+import tempfile
+
+from .hierarchy import HIERARCHY_LEVELS
+from .kpis import CHUNK_SIZE, REQUIRED_COLUMNS
+from .parts import PART_COLUMN
+from .rollup import GROUP_COLUMN, TIME_COLUMN
+
+INPUT_FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".ipc": "feather",
+}
+OUTPUT_FORMATS = ["csv", "csv.gz", "parquet", "feather"]
+MIME_TYPES = {
+    "csv": "text/csv",
+    "csv.gz": "application/gzip",
+    "parquet": "application/vnd.apache.parquet",
+    "feather": "application/vnd.apache.arrow.file",
+}
+# Rows serialized at a time on export, so writing never holds more than one slice in text/Arrow form
+EXPORT_CHUNK_ROWS = 100_000
+# Column projection: only what the KPIs, rollups, the plant/line drill-down and the part-master lookup read is loaded
+INPUT_COLUMNS = REQUIRED_COLUMNS + [GROUP_COLUMN, TIME_COLUMN] + HIERARCHY_LEVELS[:-1] + [PART_COLUMN]
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    ext = os.path.splitext(str(getattr(path, "name", path)))[1].lower()
+    if ext not in INPUT_FORMATS:
+        raise ValueError(f"Unsupported file type '{ext}' for {path}; expected one of {', '.join(sorted(INPUT_FORMATS))}")
+    return INPUT_FORMATS[ext]
+
+
+def output_format(path):
+    # Like detect_format, but for files being written, which can also be gzip-compressed CSV
+    name = str(path).lower()
+    if name.endswith(".csv.gz"):
+        return "csv.gz"
+    ext = os.path.splitext(name)[1]
+    if ext not in INPUT_FORMATS:
+        raise ValueError(f"Unsupported output file type '{ext}' for {path}; "
+                         f"expected one of {', '.join(sorted(INPUT_FORMATS) + ['.csv.gz'])}")
+    return INPUT_FORMATS[ext]
+
+
+def _is_local_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+
+def _projection(names, columns):
+    if columns is None:
+        return list(names)
+    return [name for name in names if name in columns]
+
+
+def _arrow_source(source):
+    # Local files are memory-mapped; uploads and other buffers are read as-is
+    import pyarrow as pa
+
+    if _is_local_path(source):
+        return pa.memory_map(os.fspath(source), "r")
+    if hasattr(source, "getbuffer"):
+        return pa.BufferReader(source.getbuffer())
+    return source
+
+
+def _read_arrow(source, fmt, columns):
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+
+    if fmt == "parquet":
+        parquet_file = pq.ParquetFile(_arrow_source(source))
+        return parquet_file.read(columns=_projection(parquet_file.schema_arrow.names, columns))
+    reader = pyarrow.ipc.open_file(_arrow_source(source))
+    table = reader.read_all()
+    return table.select(_projection(table.schema.names, columns))
+
+
+def read_table(source, fmt=None, columns=INPUT_COLUMNS):
+    import pandas as pd
+
+    fmt = detect_format(source, fmt)
+    if fmt == "csv":
+        usecols = None if columns is None else (lambda col: col in columns)
+        return pd.read_csv(source, usecols=usecols)
+    return _read_arrow(source, fmt, columns).to_pandas()
+
+
+def iter_table_chunks(source, fmt=None, chunksize=CHUNK_SIZE, columns=INPUT_COLUMNS):
+    fmt = detect_format(source, fmt)
+    if fmt == "csv":
+        import pandas as pd
+
+        usecols = None if columns is None else (lambda col: col in columns)
+        yield from pd.read_csv(source, usecols=usecols, chunksize=chunksize)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(_arrow_source(source))
+        projected = _projection(parquet_file.schema_arrow.names, columns)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=projected):
+            yield batch.to_pandas()
+    else:
+        import pyarrow.ipc
+
+        reader = pyarrow.ipc.open_file(_arrow_source(source))
+        projected = _projection(reader.schema.names, columns)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i).select(projected)
+            for start in range(0, batch.num_rows, chunksize):
+                yield batch.slice(start, chunksize).to_pandas()
+
+
+def _frame_slices(df, columns, chunksize):
+    positions = None if columns is None else [df.columns.get_loc(col) for col in columns]
+    # An empty frame still yields one (empty) slice so the header/schema gets written
+    for start in range(0, max(len(df), 1), chunksize):
+        chunk = df.iloc[start:start + chunksize]
+        yield chunk if positions is None else chunk.iloc[:, positions]
+
+
+def _write_arrow_chunks(slices, sink, fmt):
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+
+    writer = None
+    schema = None
+    try:
+        for chunk in slices:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                if fmt == "parquet":
+                    writer = pq.ParquetWriter(sink, schema)
+                else:
+                    writer = pyarrow.ipc.new_file(sink, schema, options=pyarrow.ipc.IpcWriteOptions(compression="lz4"))
+            elif not table.schema.equals(schema):
+                # e.g. an object column that is all-null in one slice
+                table = table.cast(schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_chunks(df, sink, fmt="csv", columns=None, chunksize=EXPORT_CHUNK_ROWS):
+    # CSV slices go straight to the (optionally gzipped) binary sink; Parquet gets one row group per slice
+    slices = _frame_slices(df, columns, chunksize)
+    if fmt in ("csv", "csv.gz"):
+        out = gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=6) if fmt == "csv.gz" else sink
+        for i, chunk in enumerate(slices):
+            chunk.to_csv(out, index=False, header=i == 0)
+        if out is not sink:
+            out.close()
+    else:
+        _write_arrow_chunks(slices, sink, fmt)
+
+
+def write_table(df, path, fmt=None, columns=None, chunksize=EXPORT_CHUNK_ROWS):
+    fmt = detect_format(path, fmt)
+    if _is_local_path(path):
+        with open(path, "wb") as sink:
+            write_chunks(df, sink, fmt, columns, chunksize)
+    else:
+        write_chunks(df, path, fmt, columns, chunksize)
+
+
+def table_bytes(df, fmt="csv", columns=None):
+    buffer = io.BytesIO()
+    write_chunks(df, buffer, fmt, columns)
+    return buffer.getvalue()
+
+
+def export_file(df, fmt="csv", columns=None):
+    # Spools the export to disk slice by slice and returns the finished (compressed) file as bytes, which is what
+    # st.download_button accepts from a deferred callable; the whole text/Arrow form is never held in memory
+    with tempfile.TemporaryFile() as spool:
+        write_chunks(df, spool, fmt, columns)
+        spool.seek(0)
+        return spool.read()
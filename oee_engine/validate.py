@@ -0,0 +1,55 @@
+# Row-level validation. Every rule is one boolean mask over the whole frame; rows failing any
+# rule are split off into a reject report instead of producing inf/NaN KPIs.
+from .kpis import REQUIRED_COLUMNS
+
+REJECT_COLUMN = "Failed Rules"
+
+VALIDATION_RULES = {
+    "missing or non-numeric value": lambda df: df[REQUIRED_COLUMNS].isna().any(axis=1),
+    "negative value": lambda df: (df[REQUIRED_COLUMNS] < 0).any(axis=1),
+    "Downtime >= Planned Production Time": lambda df: df["Downtime"] >= df["Planned Production Time"],
+    "Good Count > Total Count": lambda df: df["Good Count"] > df["Total Count"],
+    "zero Total Count": lambda df: df["Total Count"] == 0,
+    "zero Ideal Cycle Time": lambda df: df["Ideal Cycle Time"] == 0,
+}
+
+
+def coerce_numeric(df):
+    # Unparseable values become NaN so the missing-value rule catches them
+    import pandas as pd
+
+    for col in REQUIRED_COLUMNS:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def validate_rows(df, rules=None):
+    # Returns (clean rows, rejected rows with a REJECT_COLUMN, {rule: failing row count})
+    import numpy as np
+
+    rules = VALIDATION_RULES if rules is None else rules
+    df = coerce_numeric(df)
+    names = list(rules)
+    masks = np.column_stack([rules[name](df).to_numpy(dtype=bool) for name in names]) if names else \
+        np.zeros((len(df), 0), dtype=bool)
+    codes = masks.astype(np.int64) @ (np.int64(1) << np.arange(len(names), dtype=np.int64))
+    failed = codes != 0
+
+    rejects = df[failed].copy()
+    # Label each distinct failure combination once, then broadcast the labels to the rows
+    combos, inverse = np.unique(codes[failed], return_inverse=True)
+    labels = np.array(["; ".join(name for i, name in enumerate(names) if combo >> i & 1) for combo in combos],
+                      dtype=object)
+    rejects[REJECT_COLUMN] = labels[inverse]
+    counts = dict(zip(names, masks.sum(axis=0).tolist()))
+    return df[~failed], rejects, counts
+
+
+def rule_counts(rejects):
+    # Per-rule failure counts recovered from a reject report (one split per distinct label)
+    counts = {}
+    for label, count in rejects[REJECT_COLUMN].value_counts().items():
+        for name in label.split("; "):
+            counts[name] = counts.get(name, 0) + int(count)
+    return counts
@@ -1,6 +1,27 @@
+import hashlib
+import io
+import os
+import tempfile
+import time
+from collections import OrderedDict
+
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
+
+from oee_charts import (MAX_BARS, WEBGL_ROWS, build_benchmark_chart, build_gauge_panel, build_pareto_chart,
+                        build_scenario_histogram, build_sensitivity_chart, build_trend_chart)
+from oee_table import render_paged_table
+from oee_engine import (BUCKETS, CSVTail, DEFAULT_LIVE_CSV, DEFAULT_STORE_PATH, DISTRIBUTIONS, EVENT_COLUMNS,
+                        HIERARCHY_LEVELS, INPUT_FORMATS, IncrementalKPIs, KPICube, KPIStore, KPI_SPECS, LIVE_CSV_ENV,
+                        LIVE_HOST_ENV, LIVE_PORT_ENV, LOSS_FACTORS, MIME_TYPES, OUTPUT_FORMATS, PART_MASTER_ENV,
+                        PagedView, REQUIRED_COLUMNS, RollingOEE, SCENARIOS, SOCKET_HOST, SOCKET_PORT, SOURCE_COLUMN,
+                        STORE_PATH_ENV, SocketFeed, StageTimer, SyntheticFeed, TIME_COLUMN, UNASSIGNED,
+                        alert_counts,
+                        apply_event_downtime, apply_part_master, available_backends, calculate_kpis,
+                        calculate_kpis_streaming, compact_kpis, default_thresholds, default_workers, detect_format,
+                        evaluate_alerts, export_file, fleet_kpis, fleet_table, full_kpi_nbytes, load_part_master,
+                        machine_sums, memory_report, process_sources, read_table, rollup_kpis, rule_counts,
+                        scenario_base, simulate, source_totals, validate_rows)
 
 # Set page title and layout
 st.set_page_config(page_title="OEE Calculator", layout="centered")
@@ -11,49 +32,28 @@ This tool calculates **OEE**, **Scrap Rate**, and **Yield vs. Planned Output** f
 Upload a CSV or enter data manually to see KPIs, benchmarks, and alerts.
 """)
 
-st.info("PLEASE NOTE: Entered data will only be stored in memory (RAM) only for the duration of the session and is deleted as soon as it is no longer needed—such as when the user uploads another file, clears the file uploader, or closes the browser tab. This data is not saved to disk or permanently stored in this app.")
-
-input_method = st.radio("Select input method:", ["Manual Entry", "Upload CSV"])
-
-def calculate_kpis(df):
-    df["Run Time"] = df["Planned Production Time"] - df["Downtime"]
-    df["Availability"] = df["Run Time"] / df["Planned Production Time"]
-    df["Performance"] = (df["Ideal Cycle Time"] * df["Total Count"]) / df["Run Time"]
-    df["Quality"] = df["Good Count"] / df["Total Count"]
-    df["OEE"] = df["Availability"] * df["Performance"] * df["Quality"]
-
-    df["Scrap Count"] = df["Total Count"] - df["Good Count"]
-    df["Scrap Rate (%)"] = (df["Scrap Count"] / df["Total Count"]) * 100
-    df["Planned Output"] = df["Planned Production Time"] / df["Ideal Cycle Time"]
-    df["Yield vs. Planned Output (%)"] = (df["Good Count"] / df["Planned Output"]) * 100
-    return df
-
-def plot_gauge(title, value, suffix="%", alert_threshold=None, reverse_alert=False, steps=None):
-    color = "darkblue"
-    if alert_threshold is not None:
-        if (reverse_alert and value > alert_threshold) or (not reverse_alert and value < alert_threshold):
-            color = "crimson"
-
-    if steps is None:
-        # Default steps if none provided
-        steps = [
-            {'range': [0, 60], 'color': "#ffcccc"},
-            {'range': [60, 85], 'color': "#ffe680"},
-            {'range': [85, 100], 'color': "#ccffcc"},
-        ]
-
-    fig = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=value,
-        number={'suffix': suffix},
-        title={'text': title},
-        gauge={
-            'axis': {'range': [0, 100]},
-            'bar': {'color': color},
-            'steps': steps
-        }
-    ))
-    st.plotly_chart(fig, use_container_width=True)
+st.info("PLEASE NOTE: Entered data will only be stored in memory (RAM) only for the duration of the session and is deleted as soon as it is no longer needed—such as when the user uploads another file, clears the file uploader, or closes the browser tab. This data is not saved to disk or permanently stored in this app, unless you turn on the optional local history store, which writes records to a SQLite file on the machine running the app.")
+
+input_method = st.radio("Select input method:", ["Manual Entry", "Upload CSV", "Live Feed", "History"])
+diagnostics = st.checkbox("🩺 Diagnostics (per-stage timing and memory)")
+timer = StageTimer(enabled=diagnostics)
+
+with st.expander("🚨 Alert thresholds"):
+    edited_thresholds = st.data_editor(default_thresholds()[["KPI", "Threshold", "Higher Is Worse"]],
+                                       disabled=["KPI", "Higher Is Worse"], hide_index=True, key="alert_thresholds")
+    alert_thresholds = default_thresholds().assign(Threshold=edited_thresholds["Threshold"].astype(float).to_numpy())
+    machine_threshold_file = st.file_uploader("Per-machine overrides (CSV with Description, KPI, Threshold)", type="csv",
+                                              key="machine_thresholds")
+    machine_thresholds = None
+    if machine_threshold_file:
+        try:
+            overrides = pd.read_csv(machine_threshold_file)
+            missing = [col for col in ["Description", "KPI", "Threshold"] if col not in overrides.columns]
+            if missing:
+                raise ValueError(f"missing column(s) {', '.join(missing)}")
+            machine_thresholds = overrides.assign(Threshold=overrides["Threshold"].astype(float))
+        except Exception as e:
+            st.warning(f"⚠️ Per-machine overrides not applied: {e}")
 
 # def plot_benchmark_chart(title, values, benchmark, x_labels=None):
 #     fig = go.Figure()
@@ -64,45 +64,41 @@ def plot_gauge(title, value, suffix="%", alert_threshold=None, reverse_alert=Fal
 #     fig.update_layout(title=title, xaxis_title="Description" if x_labels is not None else "Record", yaxis_title=title)
 #     st.plotly_chart(fig, use_container_width=True)
 
-def plot_benchmark_chart(title, values, benchmark, x_labels=None):
-    x = x_labels if x_labels is not None else list(range(1, len(values) + 1))
-
-    fig = go.Figure()
-
-    # Bar plot for KPI values with labels inside
-    fig.add_trace(go.Bar(
-        x=x,
-        y=values,
-        name=title,
-        text=[f"{v:.1f}%" for v in values],
-        textposition='inside',
-        insidetextanchor="middle",
-        textfont=dict(color='white'),
-        marker_color='steelblue'     
-    ))
-
-    # Line plot for benchmark values with label at end
-    fig.add_trace(go.Scatter(
-        x=x,
-        y=[benchmark] * len(values),
-        mode="lines+text",
-        name="Benchmark",
-        line=dict(dash="dash", color="darkorange"),
-        text=[f"{benchmark:.1f}%"] + [""] * (len(x) - 1),
-        textposition="top right",
-        showlegend=True
-    ))
-
-    fig.update_layout(
-        title=title,
-        xaxis_title="Description" if x_labels is not None else "Record",
-        yaxis_title=title,
-        barmode='group',
-        height=400
-        # legend=dict(x=0.01, y=0.99)
-    )
+def render_kpi_panel(row, thresholds=None, machine_thresholds=None):
+    # One gauge figure plus any threshold warnings, for manual entry and single-record uploads alike
+    alerts = evaluate_alerts(pd.DataFrame([row]), thresholds, machine_thresholds).set_index("KPI")
+    st.plotly_chart(build_gauge_panel(row, alerted=set(alerts.index)), use_container_width=True)
+    for spec in KPI_SPECS:
+        if spec["title"] in alerts.index:
+            alert = alerts.loc[spec["title"]]
+            if alert["Threshold"] == spec["threshold"]:
+                st.warning(spec["warning"])
+            else:
+                st.warning(f"⚠️ {spec['title']} is {alert['Value']:.1f}%, {'above' if spec['reverse'] else 'below'} "
+                           f"the configured threshold of {alert['Threshold']:g}%.")
+
+def render_alerts(entry, thresholds, machine_thresholds):
+    # Alerts for every record x KPI, worst first; cached with the results per threshold configuration
+    key = cache_key(thresholds.to_json().encode("utf-8"),
+                    machine=None if machine_thresholds is None else machine_thresholds.to_json())
+    cached = entry.setdefault("alerts", {})
+    if key not in cached:
+        results = entry["results"]
+        cached[key] = (alert_counts(results, thresholds, machine_thresholds),
+                       evaluate_alerts(results, thresholds, machine_thresholds, limit=ALERT_LIMIT))
+    counts, alerts = cached[key]
+
+    st.subheader("🚨 Alerts")
+    if not len(alerts):
+        st.success("✅ No records breach the alert thresholds.")
+        return
+    st.caption(" · ".join(f"{kpi}: {count:,}" for kpi, count in counts.items() if count))
+    st.dataframe(alerts.head(100), hide_index=True)
+    st.download_button(f"📥 Download Worst {len(alerts):,} Alerts (CSV)", alerts.to_csv(index=False).encode("utf-8"),
+                       "kpi_alerts.csv", "text/csv")
 
-    st.plotly_chart(fig, use_container_width=True)
+def plot_benchmark_chart(title, values, benchmark, x_labels=None):
+    st.plotly_chart(build_benchmark_chart(title, values, benchmark, x_labels), use_container_width=True)
 
 #     ***** This function works except for benchmark text *****
 # def plot_benchmark_chart(title, values, benchmark, x_labels=None):
@@ -185,6 +181,362 @@ def plot_benchmark_chart(title, values, benchmark, x_labels=None):
 
 #     st.plotly_chart(fig, use_container_width=True)
 
+DISPLAY_KPIS = [spec["column"] for spec in KPI_SPECS]
+# Totals and KPIs shown for each record or group; every view puts its own key columns in front
+RESULT_COLUMNS = ["Planned Production Time", "Downtime", "Total Count", "Good Count",
+                  "Availability", "Performance", "Quality", "OEE",
+                  "Scrap Rate (%)", "Yield vs. Planned Output (%)"]
+# (KPI column, benchmark, scale to %) for the multi-record charts
+BENCHMARK_CHARTS = [(spec["column"], spec["threshold"], spec["scale"]) for spec in KPI_SPECS]
+OEE_BENCHMARK = next(benchmark for column, benchmark, _ in BENCHMARK_CHARTS if column == "OEE")
+ALERT_LIMIT = 10_000
+EXPORT_LABELS = {"csv": "CSV", "csv.gz": "CSV (gzip)", "parquet": "Parquet", "feather": "Arrow/Feather"}
+CACHE_MAX_ENTRIES = 8
+# number_inputs per what-if distribution: (label, default)
+SCENARIO_PARAMS = {
+    "fixed": [("Factor", 1.0)],
+    "uniform": [("Low", 0.9), ("High", 1.1)],
+    "normal": [("Mean", 1.0), ("SD", 0.05)],
+    "triangular": [("Low", 0.9), ("Mode", 1.0), ("High", 1.1)],
+}
+CACHE_MAX_BYTES = 2 * 1024**3
+# Like the part master, the history store is configured by whoever runs the app, never named in the page
+HISTORY_STORE_PATH = os.environ.get(STORE_PATH_ENV, DEFAULT_STORE_PATH)
+# Likewise the file and socket the live feeds read; visitors only choose among them
+LIVE_CSV_PATH = os.environ.get(LIVE_CSV_ENV, DEFAULT_LIVE_CSV)
+LIVE_SOCKET = (os.environ.get(LIVE_HOST_ENV, SOCKET_HOST), int(os.environ.get(LIVE_PORT_ENV, SOCKET_PORT)))
+
+class KPIResultCache:
+    # Size-bounded LRU of computed upload results, evicting the least recently used entry first
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key][0]
+        self.misses += 1
+        return None
+
+    def put(self, key, value, nbytes=0):
+        if key in self.entries:
+            self.nbytes -= self.entries.pop(key)[1]
+        self.entries[key] = (value, nbytes)
+        self.nbytes += nbytes
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries or self.nbytes > self.max_bytes):
+            self.nbytes -= self.entries.popitem(last=False)[1][1]
+
+    def stats(self):
+        return f"Result cache: {self.hits} hits · {self.misses} misses · {len(self.entries)}/{self.max_entries} entries · {self.nbytes / 1024**2:.1f} MB"
+
+def cache_key(data, **params):
+    digest = hashlib.sha256(data)
+    digest.update(repr(sorted(params.items())).encode("utf-8"))
+    return digest.hexdigest()
+
+def get_result_cache():
+    # Kept in session state so uploaded data never outlives the session
+    if "kpi_result_cache" not in st.session_state:
+        st.session_state["kpi_result_cache"] = KPIResultCache()
+    return st.session_state["kpi_result_cache"]
+
+@st.cache_resource(max_entries=4, show_spinner="Indexing part master...")
+def shared_part_master(version, _load):
+    # Indexed once and shared by every session. version is the upload's content hash or the path configured in
+    # $OEE_PART_MASTER plus its modification time, so a changed file is indexed again instead of served stale.
+    return _load()
+
+def part_master_input():
+    # Returns (indexed part master or None, version for cache keys)
+    with st.expander("📦 Part master (Ideal Cycle Time by part number)"):
+        part_file = st.file_uploader(
+            "Part master", type=sorted({ext.lstrip(".") for ext in INPUT_FORMATS}), key="part_master",
+            help="Part Number and Ideal Cycle Time per part. Rows with a Part Number but no Ideal Cycle Time get it from here."
+        )
+        # A server-side file is only ever configured by whoever runs the app, never chosen in the page
+        part_path = os.environ.get(PART_MASTER_ENV)
+        if part_path and part_file is None:
+            st.caption(f"Using the part master configured on the server (${PART_MASTER_ENV}); upload a file to override it.")
+        try:
+            if part_file is not None:
+                data, fmt = part_file.getvalue(), detect_format(part_file.name)
+                version = hashlib.sha256(data).hexdigest()
+                master = shared_part_master(version, lambda: load_part_master(io.BytesIO(data), fmt))
+            elif part_path:
+                version = f"{os.path.abspath(part_path)}@{os.path.getmtime(part_path)}"
+                master = shared_part_master(version, lambda: load_part_master(part_path))
+            else:
+                return None, None
+        except (OSError, ValueError) as e:
+            st.warning(f"⚠️ Part master not loaded: {e}")
+            return None, None
+        st.caption(f"{len(master):,} parts indexed")
+    return master, version
+
+def compute_upload(data, fmt="csv", compact=False, chart_settings=None, timer=None, events=None, backend=None,
+                   part_master=None):
+    # events: optional (bytes, format) of a stop-event log that replaces the Downtime column
+    timer = timer or StageTimer()
+    with timer.stage("read"):
+        df = read_table(io.BytesIO(data), fmt)
+    with timer.stage("part_master"):
+        df, unknown_parts = apply_part_master(df, part_master)
+    downtime = None
+    if events is not None:
+        with timer.stage("event_downtime"):
+            event_data, event_fmt = events
+            df, intervals, pareto, dropped = apply_event_downtime(
+                df, read_table(io.BytesIO(event_data), event_fmt, columns=EVENT_COLUMNS))
+            downtime = {"events": int(pareto["Events"].sum()), "intervals": len(intervals), "dropped": dropped,
+                        "pareto": pareto, "figure": build_pareto_chart(pareto)}
+    with timer.stage("validate"):
+        valid = all(col in df.columns for col in REQUIRED_COLUMNS)
+        if valid:
+            df, rejects, reject_counts = validate_rows(df)
+    if not valid:
+        return {"results": None, "figures": [], "memory": None, "downtime": downtime, "unknown_parts": unknown_parts}
+
+    memory = None
+    with timer.stage("calculate_kpis"):
+        if compact:
+            # Only the KPIs the dashboard shows are materialized; the rest stay derivable from the base columns
+            results = compact_kpis(df, DISPLAY_KPIS)
+            memory = memory_report(full_kpi_nbytes(df), results)
+        else:
+            results = calculate_kpis(df, backend)
+    with timer.stage("build_figures"):
+        figures = build_figures(results, chart_settings)
+    return {"results": results, "figures": figures, "memory": memory, "rejects": rejects, "reject_counts": reject_counts,
+            "downtime": downtime, "unknown_parts": unknown_parts}
+
+def stream_upload(uploaded_file, fmt, backend=None, part_master=None, timer=None):
+    # One pass over the file in chunks. The full results and rejects are spooled to temp files that live as long as
+    # the cache entry, so reruns (including the Download click) reuse them instead of streaming the file again.
+    timer = timer or StageTimer()
+    progress = st.progress(0.0, text="Processing file in chunks...")
+    entry = {"totals": None, "preview": None, "reject_counts": {}, "rejected": 0, "unknown_parts": {},
+             "spool": tempfile.TemporaryFile(), "reject_spool": tempfile.TemporaryFile()}
+
+    def spool_rejects(rejects):
+        rejects.to_csv(entry["reject_spool"], index=False, header=not entry["rejected"])
+        entry["rejected"] += len(rejects)
+        for name, count in rule_counts(rejects).items():
+            entry["reject_counts"][name] = entry["reject_counts"].get(name, 0) + count
+
+    def note_unknown(parts):
+        entry["unknown_parts"].update(dict.fromkeys(parts))
+
+    uploaded_file.seek(0)
+    for chunk, totals in calculate_kpis_streaming(uploaded_file, fmt=fmt, reject_sink=spool_rejects, backend=backend,
+                                                  part_master=part_master, unknown_sink=note_unknown, timer=timer):
+        if entry["preview"] is None:
+            entry["preview"] = chunk.head(1000)
+        with timer.stage("spool_results"):
+            chunk.to_csv(entry["spool"], index=False, header=entry["spool"].tell() == 0)
+        if fmt == "csv":
+            progress.progress(min(uploaded_file.tell() / max(uploaded_file.size, 1), 1.0))
+        entry["totals"] = totals
+    progress.empty()
+    entry["unknown_parts"] = list(entry["unknown_parts"])
+    return entry
+
+def build_figures(results, chart_settings=None):
+    figures = []
+    if len(results) > 1:
+        x_labels = results["Description"] if "Description" in results.columns else None
+        for metric, benchmark, scale in BENCHMARK_CHARTS:
+            figures.append(build_benchmark_chart(f"{metric} by Machine / Process", results[metric] * scale, benchmark,
+                                                 x_labels=x_labels, **(chart_settings or {})))
+    return figures
+
+def render_unknown_parts(unknown, source=None):
+    prefix = f"{source}: " if source else ""
+    st.warning(f"⚠️ {prefix}{len(unknown):,} part numbers are not in the part master, so their records without an "
+               f"Ideal Cycle Time were excluded: {', '.join(unknown[:10])}{' ...' if len(unknown) > 10 else ''}")
+
+def render_rejects(reject_counts, rejects_csv, total_rejects):
+    # Rows that would produce inf/NaN KPIs are excluded and offered as a downloadable report
+    if not total_rejects:
+        return
+    st.warning(f"⚠️ {total_rejects:,} records failed validation and were excluded from the KPIs.")
+    st.dataframe(pd.DataFrame({"Rule": list(reject_counts), "Records": list(reject_counts.values())}).query("Records > 0"),
+                 hide_index=True)
+    st.download_button("📥 Download Reject Report (CSV)", rejects_csv, "kpi_rejects.csv", "text/csv")
+
+def render_fleet_metrics(fleet):
+    cols = st.columns(3)
+    cols[0].metric("Availability", f"{fleet['Availability']*100:.1f}%")
+    cols[1].metric("Performance", f"{fleet['Performance']*100:.1f}%")
+    cols[2].metric("Quality", f"{fleet['Quality']*100:.1f}%")
+    cols = st.columns(3)
+    cols[0].metric("OEE", f"{fleet['OEE']*100:.1f}%")
+    cols[1].metric("Scrap Rate", f"{fleet['Scrap Rate (%)']:.1f}%")
+    cols[2].metric("Yield vs. Planned Output", f"{fleet['Yield vs. Planned Output (%)']:.1f}%")
+
+def store_results(entry, results, store_path):
+    # Each cached result is written to a given store once; records already stored are skipped by the store itself
+    stored = entry.setdefault("stored", {})
+    if store_path not in stored:
+        with timer.stage("store_history"), KPIStore(store_path) as store:
+            stored[store_path] = store.append(results)
+    return stored[store_path]
+
+def render_downtime(downtime):
+    st.subheader("⏱️ Downtime by Reason")
+    st.caption(f"{downtime['events']:,} stop events merged into {downtime['intervals']:,} non-overlapping intervals. "
+               "Each record's Downtime is the merged stop time inside [Timestamp, Timestamp + Planned Production Time).")
+    if downtime["dropped"]:
+        st.warning(f"⚠️ {downtime['dropped']:,} events without a machine, a start/end time or with End before Start were ignored.")
+    st.plotly_chart(downtime["figure"], use_container_width=True)
+    st.dataframe(downtime["pareto"], hide_index=True)
+
+def hierarchy_mapping(results, hierarchy_file):
+    # An uploaded mapping wins; otherwise results that carry their own Plant and Line columns map themselves
+    if hierarchy_file is not None:
+        return read_table(io.BytesIO(hierarchy_file.getvalue()), detect_format(hierarchy_file.name), columns=HIERARCHY_LEVELS)
+    if all(col in results.columns for col in HIERARCHY_LEVELS):
+        return results[HIERARCHY_LEVELS].drop_duplicates()
+    return None
+
+def render_drilldown(entry, hierarchy_file):
+    # Records are summed per machine once per upload and the cube once per mapping; each drill-down step
+    # only derives KPIs from the stored sums below the selected node
+    hierarchy = hierarchy_mapping(entry["results"], hierarchy_file)
+    if hierarchy is None:
+        return
+    key = cache_key(hierarchy.to_json().encode("utf-8"))
+    cubes = entry.setdefault("cubes", {})
+    try:
+        if "machine_sums" not in entry:
+            with timer.stage("machine_sums"):
+                entry["machine_sums"] = machine_sums(entry["results"])
+        if key not in cubes:
+            with timer.stage("build_cube"):
+                cubes[key] = KPICube(entry["machine_sums"], hierarchy)
+    except ValueError as e:
+        st.warning(f"⚠️ No plant / line drill-down: {e}")
+        return
+    cube = cubes[key]
+
+    st.subheader("🏭 Plant / Line / Machine Drill-Down")
+    if cube.unassigned:
+        st.caption(f"{cube.unassigned:,} machines are not in the hierarchy mapping and are listed under {UNASSIGNED}.")
+    path = ()
+    cols = st.columns(len(cube.levels))
+    for depth, (col, level) in enumerate(zip(cols, cube.levels[:-1])):
+        # Each level offers the children of the selection above it, and is keyed on it so a new parent starts fresh
+        options = [node[-1] for node in cube.paths(depth + 1) if node[:-1] == path] if len(path) == depth else []
+        choice = col.selectbox(level, [None] + options, format_func=lambda o, level=level: f"(all {level.lower()}s)" if o is None else o,
+                               key=f"drill_{level}_{'/'.join(path)}", disabled=len(path) < depth)
+        if choice is not None:
+            path += (choice,)
+    metric, benchmark, scale = BENCHMARK_CHARTS[cols[-1].selectbox(
+        "Metric", range(len(BENCHMARK_CHARTS)), format_func=lambda i: BENCHMARK_CHARTS[i][0], key="drill_metric")]
+
+    with timer.stage("drilldown"):
+        node = cube.node(path)
+        children = cube.children(path)
+    level = cube.levels[len(path)]
+    st.caption(" > ".join(path) if path else "All plants")
+    render_fleet_metrics(node)
+    st.plotly_chart(build_benchmark_chart(f"{metric} by {level}", children[metric] * scale, benchmark,
+                                          x_labels=children[level]), use_container_width=True)
+    st.dataframe(children[[level, "Records"] + RESULT_COLUMNS], hide_index=True)
+
+def render_whatif(entry):
+    # Scenarios run on per-machine sums cached with the results, so new factors cost one batched evaluation;
+    # only the latest run is kept
+    st.subheader("🎲 What-if Scenarios")
+    st.caption("Factors multiply today's values per machine: Downtime 0.9 is 10% less downtime, Scrap 0.5 halves scrap, "
+               "Speed 1.05 is 5% more output per minute of run time. Pick a distribution to sample a factor per scenario.")
+    specs = {}
+    for name, loss in LOSS_FACTORS.items():
+        cols = st.columns(4)
+        kind = cols[0].selectbox(loss, DISTRIBUTIONS, key=f"whatif_{name}")
+        specs[name] = (kind, *(col.number_input(label, min_value=0.0, value=default, step=0.05, key=f"whatif_{name}_{kind}_{label}")
+                               for col, (label, default) in zip(cols[1:], SCENARIO_PARAMS[kind])))
+    fixed = all(spec[0] == "fixed" for spec in specs.values())
+    cols = st.columns(3)
+    scenarios = cols[0].number_input("Scenarios", min_value=1, max_value=100_000, value=SCENARIOS, step=1000, disabled=fixed)
+    per_machine = cols[1].checkbox("Draw per machine", disabled=fixed,
+                                   help="Sample every machine's factors independently instead of one draw for the whole fleet")
+    seed = cols[2].number_input("Seed", min_value=0, value=0, disabled=fixed)
+    if fixed:
+        scenarios, per_machine = 1, False
+
+    if "scenario_base" not in entry:
+        with timer.stage("scenario_base"):
+            entry["scenario_base"] = scenario_base(entry["results"])
+    key = cache_key(repr(specs).encode("utf-8"), scenarios=scenarios, per_machine=per_machine, seed=seed)
+    if entry.get("whatif", (None,))[0] != key:
+        try:
+            with timer.stage("simulate"):
+                entry["whatif"] = (key, simulate(entry["scenario_base"], specs, scenarios, per_machine, seed))
+        except ValueError as e:
+            st.warning(f"⚠️ Scenarios not run: {e}")
+            return
+    scenario_results, sensitivity, baseline = entry["whatif"][1]
+
+    oee = scenario_results["OEE"]
+    cols = st.columns(3)
+    cols[0].metric("OEE today", f"{baseline['OEE']*100:.1f}%")
+    cols[1].metric("Scenario OEE" if fixed else "Median scenario OEE", f"{oee.median()*100:.1f}%",
+                   f"{(oee.median() - baseline['OEE'])*100:+.1f} pp")
+    if not fixed:
+        cols[2].metric("5th–95th percentile", f"{oee.quantile(0.05)*100:.1f}% – {oee.quantile(0.95)*100:.1f}%")
+        st.plotly_chart(build_scenario_histogram(oee, baseline["OEE"], OEE_BENCHMARK), use_container_width=True)
+    st.plotly_chart(build_sensitivity_chart(sensitivity), use_container_width=True)
+    st.dataframe(sensitivity, hide_index=True)
+    st.download_button(f"📥 Download {len(scenario_results):,} Scenarios (CSV)", export_data(scenario_results),
+                       "oee_scenarios.csv", "text/csv")
+
+def incremental_entry(data, fmt, key_columns, chart_settings, part_master=None, backend=None):
+    # Session-scoped: only rows not seen in earlier uploads go through calculate_kpis
+    state = st.session_state.get("kpi_incremental")
+    if state is None or state.key_columns != key_columns or state.part_master is not part_master:
+        state = st.session_state["kpi_incremental"] = IncrementalKPIs(key_columns, part_master=part_master)
+        st.session_state.pop("kpi_incremental_entry", None)
+    # Every backend gives the same KPIs, so switching it applies to the next rows without starting over
+    state.backend = backend
+    state.update_bytes(data, fmt)
+
+    entry = st.session_state.get("kpi_incremental_entry")
+    if (entry is None or entry["rows"] != state.rows or entry["rejected"] != state.rejected
+            or entry["chart_settings"] != chart_settings):
+        results = state.results()
+        rejects = state.rejects()
+        entry = {
+            "results": results,
+            "figures": build_figures(results, chart_settings) if results is not None else [],
+            "memory": None,
+            "rejects": rejects if rejects is not None else (),
+            "reject_counts": rule_counts(rejects) if rejects is not None else {},
+            "rows": state.rows,
+            "rejected": state.rejected,
+            "chart_settings": chart_settings,
+            "rollups": {bucket: state.rollup_kpis(bucket) for bucket in state.rollups},
+        }
+        st.session_state["kpi_incremental_entry"] = entry
+    entry["unknown_parts"] = list(state.unknown_parts)
+    return entry, state
+
+def export_data(df, fmt="csv", columns=None):
+    # Deferred download: the file is written slice by slice only when the button is clicked
+    return lambda: export_file(df, fmt, columns)
+
+def rewound(spool):
+    # Deferred download of a temp file the script already wrote (closed when garbage collected), read back as bytes
+    def data():
+        spool.seek(0)
+        return spool.read()
+    return data
+
 if input_method == "Manual Entry":
     with st.form("manual_kpis"):
         st.subheader("🔧 Input Production Data")
@@ -209,226 +561,328 @@ if input_method == "Manual Entry":
 
         st.success("✅ KPIs Calculated")
         
-        # Availability
-        plot_gauge(
-            "Availability",
-            result["Availability"] * 100,
-            suffix="%",
-            alert_threshold=90,
-            steps=[
-                {'range': [0, 70], 'color': "#ffcccc"},
-                {'range': [70, 90], 'color': "#ffe680"},
-                {'range': [90, 100], 'color': "#ccffcc"}
-            ]
-        )
-        if result["Availability"] * 100 < 90:
-            st.warning("⚠️ Availability is below typical benchmark of 90%.")
-
-        # Performance
-        plot_gauge(
-            "Performance",
-            result["Performance"] * 100,
-            suffix="%",
-            alert_threshold=95,
-            steps=[
-                {'range': [0, 75], 'color': "#ffcccc"},
-                {'range': [75, 95], 'color': "#ffe680"},
-                {'range': [95, 100], 'color': "#ccffcc"}
-            ]
-        )    
-        if result["Performance"] * 100 < 95:
-            st.warning("⚠️ Performance is below typical benchmark of 95%.")
-        
-        # Quality
-        plot_gauge(
-            "Quality",
-            result["Quality"] * 100,
-            suffix="%",
-            alert_threshold=99,
-            steps=[
-                {'range': [0, 90], 'color': "#ffcccc"},
-                {'range': [90, 99], 'color': "#ffe680"},
-                {'range': [99, 100], 'color': "#ccffcc"}
-            ]
-        )
-        if result["Quality"] * 100 < 99:
-            st.warning("⚠️ Quality is below typical benchmark of 99%.")   
-        
-        # OEE
-        plot_gauge(
-            "OEE",
-            result["OEE"]*100,
-            suffix="%",
-            alert_threshold=85,
-            steps=[
-                {'range': [0, 70], 'color': "#ffcccc"},
-                {'range': [70, 85], 'color': "#ffe680"},
-                {'range': [85, 100], 'color': "#ccffcc"}
-            ]
-        )
-        if result["OEE"]*100 < 85:
-            st.warning("⚠️ OEE below world-class standard (85%). Consider investigating downtime, speed losses, or quality issues.")  
-                
-        # Scrap Rate
-        plot_gauge(
-            "Scrap Rate",
-            result["Scrap Rate (%)"],
-            suffix="%",
-            alert_threshold=5,
-            reverse_alert=True,
-            steps=[
-                {'range': [0, 2], 'color': "#ccffcc"},
-                {'range': [2, 5], 'color': "#ffe680"},
-                {'range': [5, 100], 'color': "#ffcccc"}
-            ]
-        )
-        if result["Scrap Rate (%)"] > 5:
-            st.warning("⚠️ Scrap Rate exceeds target of 5%. Investigate defect sources.")
-
-        # Yield vs Planned Output
-        plot_gauge(
-            "Yield vs. Planned Output",
-            result["Yield vs. Planned Output (%)"],
-            suffix="%", 
-            alert_threshold=95,
-            steps=[
-                {'range': [0, 70], 'color': "#ffcccc"},
-                {'range': [70, 95], 'color': "#ffe680"},
-                {'range': [95, 100], 'color': "#ccffcc"}
-            ]
-        )
-        if result["Yield vs. Planned Output (%)"] < 95:
-            st.warning("⚠️ Yield vs. Planned Output is below expected 95%. Review production efficiency.")
+        render_kpi_panel(result, alert_thresholds, machine_thresholds)
 
         csv = df.to_csv(index=False).encode("utf-8")
         st.download_button("📥 Download Input Data (CSV)", csv, "input_data.csv", "text/csv")
 
+elif input_method == "Live Feed":
+    st.subheader("📡 Live Rolling OEE")
+    source = st.radio("Feed", ["Synthetic", "Tail a CSV file", "Local socket"], horizontal=True,
+                      help="For testing, `python -m oee_engine.feed csv live_feed.csv` or `python -m oee_engine.feed socket` "
+                           "writes a synthetic feed.")
+    if source == "Tail a CSV file":
+        st.caption(f"Tailing {LIVE_CSV_PATH} (set ${LIVE_CSV_ENV} where the app runs to change it)")
+        feed_args = (LIVE_CSV_PATH, st.checkbox("Include rows already in the file"))
+    elif source == "Local socket":
+        st.caption(f"Reading {LIVE_SOCKET[0]}:{LIVE_SOCKET[1]} (set ${LIVE_HOST_ENV} / ${LIVE_PORT_ENV} where the app runs "
+                   "to change it)")
+        feed_args = LIVE_SOCKET
+    else:
+        feed_args = (st.number_input("Records per second", min_value=1.0, value=20.0),)
+    window = int(st.number_input("Window (most recent records)", min_value=10, value=500, step=50))
+    refresh = st.number_input("Refresh every (seconds)", min_value=0.1, value=0.5, step=0.1)
+
+    # Feed and ring buffer live in session state; the fragment below only polls and redraws the gauges
+    live = st.session_state.get("kpi_live")
+    if live is None or live["key"] != (source, feed_args, window):
+        if live is not None:
+            live["feed"].close()
+        feed_type = {"Synthetic": SyntheticFeed, "Tail a CSV file": CSVTail, "Local socket": SocketFeed}[source]
+        live = st.session_state["kpi_live"] = {"key": (source, feed_args, window), "feed": feed_type(*feed_args),
+                                               "rolling": RollingOEE(window)}
+
+    @st.fragment(run_every=refresh)
+    def live_gauges():
+        rolling = live["rolling"]
+        try:
+            rolling.extend(live["feed"].poll())
+        except OSError as e:
+            st.error(f"❌ Feed unavailable: {e}")
+            live["feed"].close()
+            return
+        kpis = rolling.kpis()
+        if kpis is None:
+            st.info("Waiting for records...")
+            return
+        st.caption(f"Last {rolling.count:,} records · {rolling.received:,} received · {rolling.rejected:,} rejected · "
+                   f"updated {time.strftime('%H:%M:%S')}")
+        alerts = evaluate_alerts(pd.DataFrame([kpis]), alert_thresholds)
+        st.plotly_chart(build_gauge_panel(kpis, alerted=set(alerts["KPI"])), use_container_width=True)
+
+    live_gauges()
+
+elif input_method == "History":
+    st.subheader("🗄️ KPI History")
+    st.caption(f"History store: {HISTORY_STORE_PATH}")
+    try:
+        if not os.path.exists(HISTORY_STORE_PATH):
+            st.info("No history yet. Turn on “Save records to the local history store” when uploading a file.")
+        else:
+            with KPIStore(HISTORY_STORE_PATH) as store:
+                first, last, count = store.time_range()
+                st.caption(f"{count:,} records stored, {first} to {last}")
+                machines = st.multiselect("Machines / lines (empty = all)", store.machines())
+                days = st.number_input("Last N days (0 = everything)", min_value=0, value=90)
+                bucket = st.selectbox("Trend by", BUCKETS, index=1)
+                metric, benchmark, scale = st.selectbox("Trend KPI", BENCHMARK_CHARTS, index=3, format_func=lambda chart: chart[0])
+                start = pd.Timestamp.now().normalize() - pd.Timedelta(days=days) if days else None
+
+                # Aggregated inside SQLite over the (Description, Timestamp) index; only sums come back
+                with timer.stage("history_summary"):
+                    summary = store.summary(machines, start)
+                if not len(summary):
+                    st.info("No stored records in this range.")
+                else:
+                    render_fleet_metrics(fleet_kpis(summary.sum(numeric_only=True)))
+                    st.dataframe(summary[["Description", "Records"] + RESULT_COLUMNS], hide_index=True)
+                    with timer.stage("history_trend"):
+                        trend = store.trend(bucket, machines, start, by_machine=bool(machines))
+                    st.plotly_chart(build_trend_chart(trend, metric, benchmark, scale), use_container_width=True)
+    except Exception as e:
+        st.error(f"An error occurred: {e}")
+
 else:
     st.subheader("📂 Upload CSV File")
-    uploaded_file = st.file_uploader("Upload CSV", type="csv")
+    multi_file = st.checkbox("Multiple files (e.g. one export per plant or line)")
+    uploaded_file = st.file_uploader("Upload CSV, Parquet or Arrow/Feather", type=sorted({ext.lstrip(".") for ext in INPUT_FORMATS}),
+                                     accept_multiple_files=multi_file)
+    # Multiple files are each read whole in a worker process, so the single-file memory modes don't apply;
+    # a box ticked before switching to multiple files stays off rather than half-applying
+    streaming = st.checkbox(
+        "Streaming mode (large files)",
+        disabled=multi_file,
+        help="Reads the file in chunks so memory stays flat. Shows a preview and fleet totals; the full per-row results are in the download."
+    ) and not multi_file
+
+    compact = st.checkbox(
+        "Compact mode (lower memory)",
+        disabled=multi_file or streaming,
+        help="Stores counts as small integers, times as float32 and machine names as categories, and only keeps the KPI columns shown below."
+    ) and not multi_file
+
+    incremental = st.checkbox(
+        "Incremental mode (only compute newly appended rows)",
+        disabled=multi_file or streaming or compact,
+        help="Keeps results for this session and only calculates rows that were not in an earlier upload, e.g. when each shift's file is the previous one plus new rows."
+    ) and not (multi_file or streaming or compact)
+    key_columns = None
+    if incremental:
+        key_column = st.text_input("Key column (optional)", help="Column that uniquely identifies a row. Leave empty to compare whole rows.")
+        key_columns = [key_column] if key_column else None
+        if st.button("Clear session results"):
+            st.session_state.pop("kpi_incremental", None)
+            st.session_state.pop("kpi_incremental_entry", None)
+
+    save_history = st.checkbox(
+        "💾 Save records to the local history store",
+        disabled=multi_file or streaming,
+        help="Off by default. Appends each record and its KPIs to a SQLite file so trends can be queried under History "
+             "without re-uploading. Records already in the store are skipped."
+    )
+    store_path = HISTORY_STORE_PATH if save_history else None
+
+    backend = st.selectbox(
+        "Compute backend", ["auto"] + available_backends(), disabled=compact,
+        help="All backends give the same KPIs. auto uses pandas for small files, NumPy arrays from 10k rows and "
+             "Polars (if installed, on multi-core machines) from 1M rows."
+    )
+
+    event_file = st.file_uploader(
+        "Downtime event log (optional)", type=sorted({ext.lstrip(".") for ext in INPUT_FORMATS}), key="downtime_events",
+        disabled=multi_file or streaming or incremental,
+        help="One row per stop with Description, Start, End and Reason. Overlapping stops are merged per machine and "
+             "replace the Downtime column; the upload then also needs a Timestamp per record."
+    )
 
-    if uploaded_file:
+    hierarchy_file = st.file_uploader(
+        "Plant / line hierarchy (optional)", type=sorted({ext.lstrip(".") for ext in INPUT_FORMATS}), key="hierarchy",
+        disabled=streaming,
+        help="One row per machine with Plant, Line and Description, for drilling down from plant to line to machine. "
+             "Not needed if the upload already has Plant and Line columns."
+    )
+
+    part_master, part_master_version = part_master_input()
+
+    with st.expander("⚙️ Chart settings for large files"):
+        chart_settings = {
+            "max_bars": st.number_input("Max bars per chart (top/bottom records plus 'Others')", min_value=3, value=MAX_BARS),
+            "webgl_rows": st.number_input("Records before switching unlabeled charts to WebGL", min_value=100, value=WEBGL_ROWS),
+        }
+
+    if multi_file:
+        workers = st.number_input("Worker processes", min_value=1, value=default_workers())
+        if uploaded_file:
+            try:
+                cache = get_result_cache()
+                digests = b"".join(hashlib.sha256(f.name.encode("utf-8") + f.getvalue()).digest() for f in uploaded_file)
+                key = cache_key(digests, multi_file=True, backend=backend, benchmarks=BENCHMARK_CHARTS,
+                                charts=chart_settings, part_master=part_master_version)
+                entry = cache.get(key)
+                if entry is None:
+                    with st.spinner(f"Processing {len(uploaded_file)} files..."):
+                        with timer.stage("process_sources"):
+                            results, errors, rejects, unknown = process_sources(
+                                [(f.name, f.getvalue()) for f in uploaded_file], workers, part_master=part_master,
+                                timer=timer, backend=backend)
+                    entry = {"results": results, "errors": errors, "figures": [], "fleet": None, "rejects": rejects,
+                             "reject_counts": rule_counts(rejects) if rejects is not None else {}, "unknown_parts": unknown}
+                    if results is not None:
+                        with timer.stage("fleet_table"):
+                            entry["fleet"] = fleet_table(source_totals(results))
+                        with timer.stage("build_figures"):
+                            entry["figures"] = build_figures(results, chart_settings)
+                    cache.put(key, entry, int(results.memory_usage(deep=True).sum()) if results is not None else 0)
+
+                for name, message in entry["errors"].items():
+                    st.error(f"❌ {name}: {message}")
+                for name, parts in entry["unknown_parts"].items():
+                    render_unknown_parts(parts, name)
+                if entry["rejects"] is not None and len(entry["rejects"]):
+                    render_rejects(entry["reject_counts"], export_data(entry["rejects"]), len(entry["rejects"]))
+                if entry["results"] is not None:
+                    results = entry["results"]
+                    st.success(f"✅ KPIs Calculated for {len(results):,} Records from {results[SOURCE_COLUMN].nunique()} Files")
+                    st.subheader("Fleet Summary by File")
+                    st.dataframe(entry["fleet"][[SOURCE_COLUMN, "Records"] + RESULT_COLUMNS])
+                    for fig in entry["figures"]:
+                        st.plotly_chart(fig, use_container_width=True)
+                    with timer.stage("alerts"):
+                        render_alerts(entry, alert_thresholds, machine_thresholds)
+                    render_drilldown(entry, hierarchy_file)
+                    render_whatif(entry)
+                    st.download_button("📥 Download Combined Results (CSV gzip)", export_data(entry["results"], "csv.gz"),
+                                       "kpi_results_combined.csv.gz", MIME_TYPES["csv.gz"])
+            except Exception as e:
+                st.error(f"An error occurred: {e}")
+
+            st.caption(get_result_cache().stats())
+
+    elif uploaded_file and streaming:
         try:
-            df = pd.read_csv(uploaded_file)
-            required_cols = ["Planned Production Time", "Downtime", "Total Count", "Good Count", "Ideal Cycle Time"]
-            if not all(col in df.columns for col in required_cols):
-                st.error("❌ CSV is missing required columns.")
+            fmt = detect_format(uploaded_file.name)
+            cache = get_result_cache()
+            with timer.stage("cache_lookup"):
+                key = cache_key(uploaded_file.getvalue(), fmt=fmt, streaming=True, backend=backend,
+                                part_master=part_master_version)
+                entry = cache.get(key)
+            if entry is None:
+                with timer.stage("stream_upload"):
+                    entry = stream_upload(uploaded_file, fmt, backend, part_master, timer)
+                # The full results are on disk; only the preview counts against the cache's memory budget
+                nbytes = int(entry["preview"].memory_usage(deep=True).sum()) if entry["preview"] is not None else 0
+                cache.put(key, entry, nbytes)
+            totals, preview = entry["totals"], entry["preview"]
+
+            if totals is None:
+                st.error("❌ File contains no records.")
             else:
-                results = calculate_kpis(df)
+                fleet = fleet_kpis(totals)
+                st.success(f"✅ KPIs Calculated for {fleet['Records']:,} Records")
+                if entry["unknown_parts"]:
+                    render_unknown_parts(entry["unknown_parts"])
+                if entry["rejected"]:
+                    render_rejects(entry["reject_counts"], rewound(entry["reject_spool"]), entry["rejected"])
+
+                st.subheader("Fleet Totals")
+                render_fleet_metrics(fleet)
+
+                st.caption(f"Preview of the first {len(preview):,} records")
+                st.dataframe(preview[[col for col in ["Description"] + RESULT_COLUMNS if col in preview.columns]])
+
+                st.download_button("📥 Download Results (CSV)", rewound(entry["spool"]), "kpi_results.csv", "text/csv")
+
+        except Exception as e:
+            st.error(f"An error occurred: {e}")
+
+        st.caption(get_result_cache().stats())
+
+    elif uploaded_file:
+        try:
+            data = uploaded_file.getvalue()
+            fmt = detect_format(uploaded_file.name)
+            if incremental:
+                entry, state = incremental_entry(data, fmt, key_columns, chart_settings, part_master, backend)
+                st.caption(f"Incremental mode: {state.last_delta:,} new rows calculated · {state.last_rejected:,} new rows "
+                           f"rejected · {state.rows:,} rows in this session")
+            else:
+                cache = get_result_cache()
+                with timer.stage("cache_lookup"):
+                    events = (event_file.getvalue(), detect_format(event_file.name)) if event_file else None
+                    key = cache_key(data, fmt=fmt, compact=compact, backend=backend, benchmarks=BENCHMARK_CHARTS, charts=chart_settings,
+                                    events=hashlib.sha256(events[0]).hexdigest() if events else None, part_master=part_master_version)
+                    entry = cache.get(key)
+                if entry is None:
+                    entry = compute_upload(data, fmt, compact, chart_settings, timer, events, backend, part_master)
+                    nbytes = 0
+                    if entry["results"] is not None:
+                        nbytes = int(entry["results"].memory_usage(deep=True).sum())
+                    cache.put(key, entry, nbytes)
+
+            if entry["results"] is None:
+                st.error("❌ File is missing required columns.")
+            else:
+                results = entry["results"]
                 st.success("✅ KPIs Calculated for All Records")
-                st.dataframe(results[[
-                    "Description", "Planned Production Time", "Downtime", "Total Count", "Good Count",
-                    "Availability", "Performance", "Quality", "OEE",
-                    "Scrap Rate (%)", "Yield vs. Planned Output (%)"]])
+                if save_history:
+                    try:
+                        st.caption(f"💾 {store_results(entry, results, store_path):,} new records saved to {store_path}")
+                    except ValueError as e:
+                        st.warning(f"⚠️ Not saved to the history store: {e}")
+                if entry.get("unknown_parts"):
+                    render_unknown_parts(entry["unknown_parts"])
+                if entry.get("downtime"):
+                    render_downtime(entry["downtime"])
+                if len(entry.get("rejects", ())):
+                    render_rejects(entry["reject_counts"], export_data(entry["rejects"]), len(entry["rejects"]))
+                if entry["memory"] is not None:
+                    memory = entry["memory"]
+                    st.caption(f"Compact mode: {memory['after_bytes'] / 1024**2:.1f} MB instead of {memory['before_bytes'] / 1024**2:.1f} MB "
+                               f"({memory['saved_pct']:.0f}% saved)")
+                with timer.stage("render_table"):
+                    # The view lives with the cached results, so its sort orders and filters survive reruns
+                    if "view" not in entry:
+                        entry["view"] = PagedView(results)
+                    render_paged_table(entry["view"], [col for col in ["Description"] + RESULT_COLUMNS
+                                                 if col in results.columns], "results")
 
                 if len(results) == 1:
                     row = results.iloc[0]
 
-                    # Availability
-                    plot_gauge(
-                        "Availability",
-                        row["Availability"] * 100,
-                        suffix="%",
-                        alert_threshold=90,
-                        steps=[
-                            {'range': [0, 70], 'color': "#ffcccc"},
-                            {'range': [70, 90], 'color': "#ffe680"},
-                            {'range': [90, 100], 'color': "#ccffcc"}
-                        ]
-                    )
-                    if row["Availability"] * 100 < 90:
-                        st.warning("⚠️ Availability is below typical benchmark of 90%.")
-
-                    # Performance
-                    plot_gauge(
-                        "Performance",
-                        row["Performance"] * 100,
-                        suffix="%",
-                        alert_threshold=95,
-                        steps=[
-                            {'range': [0, 75], 'color': "#ffcccc"},
-                            {'range': [75, 95], 'color': "#ffe680"},
-                            {'range': [95, 100], 'color': "#ccffcc"}
-                        ]
-                    )
-                    if row["Performance"] * 100 < 95:
-                        st.warning("⚠️ Performance is below typical benchmark of 95%.")
-
-                    # Quality
-                    plot_gauge(
-                        "Quality",
-                        row["Quality"] * 100,
-                        suffix="%",
-                        alert_threshold=99,
-                        steps=[
-                            {'range': [0, 90], 'color': "#ffcccc"},
-                            {'range': [90, 99], 'color': "#ffe680"},
-                            {'range': [99, 100], 'color': "#ccffcc"}
-                        ]
-                    )
-                    if row["Quality"] * 100 < 99:
-                        st.warning("⚠️ Quality is below typical benchmark of 99%.")
-
-                    # OEE
-                    plot_gauge(
-                        "OEE",
-                        row["OEE"]*100,
-                        suffix="%",
-                        alert_threshold=85,
-                        steps=[
-                            {'range': [0, 70], 'color': "#ffcccc"},
-                            {'range': [70, 85], 'color': "#ffe680"},
-                            {'range': [85, 100], 'color': "#ccffcc"}
-                        ]
-                    )
-                    if row["OEE"]*100 < 85:
-                        st.warning("⚠️ OEE below world-class standard (85%). Consider investigating downtime, speed losses, or quality issues.")
-
-                    # Scrap Rate
-                    plot_gauge(
-                        "Scrap Rate",
-                        row["Scrap Rate (%)"],
-                        suffix="%",
-                        alert_threshold=5,
-                        reverse_alert=True,
-                        steps=[
-                            {'range': [0, 2], 'color': "#ccffcc"},
-                            {'range': [2, 5], 'color': "#ffe680"},
-                            {'range': [5, 100], 'color': "#ffcccc"}
-                        ]
-                    )
-                    if row["Scrap Rate (%)"] > 5:
-                        st.warning("⚠️ Scrap Rate exceeds target of 5%. Investigate defect sources.")
-
-                    # Yield vs Planned Output
-                    plot_gauge(
-                        "Yield vs. Planned Output",
-                        row["Yield vs. Planned Output (%)"],
-                        suffix="%", 
-                        alert_threshold=95,
-                        steps=[
-                            {'range': [0, 70], 'color': "#ffcccc"},
-                            {'range': [70, 95], 'color': "#ffe680"},
-                            {'range': [95, 100], 'color': "#ccffcc"}
-                        ]
-                    )
-                    if row["Yield vs. Planned Output (%)"] < 95:
-                        st.warning("⚠️ Yield vs. Planned Output is below expected 95%. Review production efficiency.")
+                    with timer.stage("render_gauges"):
+                        render_kpi_panel(row, alert_thresholds, machine_thresholds)
 
                 else:
-                    x_labels = results["Description"] if "Description" in results.columns else None
-                    for metric, benchmark in zip(["Availability", "Performance", "Quality", "OEE"], [90, 95, 99, 85]):
-                        # plot_benchmark_chart(f"{metric} by Machine / Process", results[metric]*100, benchmark, x_labels=x_labels)
-                        plot_benchmark_chart(f"{metric} by Machine / Process", results[metric]*100, benchmark, x_labels=results["Description"])
-
-                    # plot_benchmark_chart("Scrap Rate (%) by Machine / Process", results["Scrap Rate (%)"], 5, x_labels=x_labels)
-                    # plot_benchmark_chart("Yield vs. Planned Output (%) by Machine / Process", results["Yield vs. Planned Output (%)"], 95, x_labels=x_labels)
-                    plot_benchmark_chart("Scrap Rate (%) by Machine / Process", results["Scrap Rate (%)"], 5, x_labels=results["Description"])
-                    plot_benchmark_chart("Yield vs. Planned Output (%) by Machine / Process", results["Yield vs. Planned Output (%)"], 95, x_labels=results["Description"])
-
-
-                export_csv = results.to_csv(index=False).encode("utf-8")
-                st.download_button("📥 Download Results (CSV)", export_csv, "kpi_results.csv", "text/csv")
+                    # Figures are built once per upload and reused from the cache on reruns
+                    for fig in entry["figures"]:
+                        with timer.stage(f"render_chart: {fig.layout.title.text}"):
+                            st.plotly_chart(fig, use_container_width=True)
+
+                    with timer.stage("alerts"):
+                        render_alerts(entry, alert_thresholds, machine_thresholds)
+
+                    render_drilldown(entry, hierarchy_file)
+
+                    if TIME_COLUMN in results.columns:
+                        st.subheader("🕒 Rollups by Shift / Day / Week")
+                        bucket = st.selectbox("Aggregate by", BUCKETS, index=1)
+                        rollups = entry.setdefault("rollups", {})
+                        if bucket not in rollups:
+                            with timer.stage(f"rollup: {bucket}"):
+                                rollups[bucket] = rollup_kpis(results, bucket)
+                        st.dataframe(rollups[bucket][[col for col in ["Period", "Description", "Records"] + RESULT_COLUMNS
+                                                     if col in rollups[bucket].columns]])
+                        st.download_button(f"📥 Download {bucket.title()} Rollup (CSV)", rollups[bucket].to_csv(index=False).encode("utf-8"),
+                                           f"kpi_rollup_{bucket}.csv", "text/csv")
+
+                with timer.stage("whatif"):
+                    render_whatif(entry)
+
+                export_format = st.radio("Export format", OUTPUT_FORMATS, format_func=EXPORT_LABELS.get, horizontal=True)
+                export_columns = st.multiselect("Export columns", list(results.columns), default=list(results.columns))
+                st.download_button(f"📥 Download Results ({EXPORT_LABELS[export_format]})",
+                                   export_data(results, export_format, export_columns), f"kpi_results.{export_format}",
+                                   MIME_TYPES[export_format], disabled=not export_columns)
 
                 # Buy Me a Coffee
                 st.markdown("""
@@ -443,3 +897,18 @@ else:
 
         except Exception as e:
             st.error(f"An error occurred: {e}")
+
+        st.caption(get_result_cache().stats())
+
+if diagnostics:
+    timer.log()
+    with st.expander("🩺 Diagnostics", expanded=True):
+        if timer.records:
+            st.caption(f"{len(timer.records)} stages · {timer.total_seconds() * 1000:.0f} ms total")
+            st.dataframe(pd.DataFrame(timer.records).assign(
+                ms=lambda d: d["seconds"] * 1000,
+                rss_mb=lambda d: d["rss_bytes"] / 1024**2,
+            ).drop(columns=["seconds", "rss_bytes"]))
+            st.download_button("📥 Download Diagnostics (JSON)", timer.to_json(input_method=input_method), "diagnostics.json", "application/json")
+        else:
+            st.caption("No instrumented stages ran on this interaction.")
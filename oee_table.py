@@ -0,0 +1,48 @@
+# Paged results table for the Streamlit apps. Sorting, filtering and paging run on the server through
+# oee_engine.PagedView; only the visible page is formatted and sent to the browser.
+import pandas as pd
+import streamlit as st
+
+from oee_engine import PAGE_SIZE, PERCENT_SCALES, format_page
+
+NO_SORT = "(file order)"
+NO_FILTER = "(none)"
+
+
+def render_paged_table(view, columns, key, page_size=PAGE_SIZE):
+    df = view.df
+    numeric = [col for col in columns if pd.api.types.is_numeric_dtype(df[col])]
+
+    cols = st.columns([3, 2, 3])
+    sort_by = cols[0].selectbox("Sort by", [NO_SORT] + columns, key=f"{key}_sort")
+    ascending = cols[1].radio("Order", ["Ascending", "Descending"], horizontal=True, key=f"{key}_order") == "Ascending"
+    text = cols[2].text_input(f"{view.text_column} contains", key=f"{key}_text") if view.text_column else None
+
+    cols = st.columns([3, 2, 2])
+    filter_column = cols[0].selectbox("Filter column", [NO_FILTER] + numeric, key=f"{key}_filter")
+    low = high = None
+    if filter_column != NO_FILTER:
+        # Bounds are entered as displayed, so percent columns are filtered in percent
+        scale = PERCENT_SCALES.get(filter_column, 1)
+        unit = " (%)" if filter_column in PERCENT_SCALES else ""
+        low = cols[1].number_input("Min" + unit, value=None, key=f"{key}_low")
+        high = cols[2].number_input("Max" + unit, value=None, key=f"{key}_high")
+        low = None if low is None else low / scale
+        high = None if high is None else high / scale
+
+    query = {
+        "sort_by": None if sort_by == NO_SORT else sort_by,
+        "ascending": ascending,
+        "text": text or None,
+        "column": None if filter_column == NO_FILTER else filter_column,
+        "low": low,
+        "high": high,
+    }
+    total = view.count(**query)
+    pages = max(-(-total // page_size), 1)
+    # Keyed on the page count so a narrower filter starts again from page 1
+    number = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, key=f"{key}_page_{pages}")
+    st.dataframe(format_page(view.page(number - 1, page_size, columns, **query)), hide_index=True)
+    start = (number - 1) * page_size
+    shown = f"Rows {start + 1:,}–{min(start + page_size, total):,} of {total:,}" if total else "No matching rows"
+    st.caption(shown + (f" (filtered from {len(df):,})" if total != len(df) else ""))
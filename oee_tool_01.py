@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 # import plotly.graph_objects as go
 
+from oee_engine import REQUIRED_COLUMNS, PagedView, calculate_oee, export_file
+from oee_table import render_paged_table
+
 # Set page title and layout
 st.set_page_config(page_title="OEE Calculator", layout="centered")
 
@@ -20,14 +23,6 @@ st.info("PLEASE NOTE: Entered data will only be stored in memory (RAM) only for
 # Toggle between manual and CSV
 input_method = st.radio("Select input method:", ["Manual Entry", "Upload CSV"])
 
-def calculate_oee(df):
-    df["Run Time"] = df["Planned Production Time"] - df["Downtime"]
-    df["Availability"] = df["Run Time"] / df["Planned Production Time"]
-    df["Performance"] = (df["Ideal Cycle Time"] * df["Total Count"]) / df["Run Time"]
-    df["Quality"] = df["Good Count"] / df["Total Count"]
-    df["OEE"] = df["Availability"] * df["Performance"] * df["Quality"]
-    return df
-
 def plot_gauge(title, value, suffix="%", alert_threshold=None):
     color = "darkblue"
     if alert_threshold is not None and value < alert_threshold:
@@ -121,20 +116,24 @@ else:
 
     if uploaded_file is not None:
         try:
-            df = pd.read_csv(uploaded_file)
- 	        # st.write("Preview of uploaded data:")
-            required_columns = ["Planned Production Time", "Downtime", "Total Count", "Good Count", "Ideal Cycle Time"]
-            if not all(col in df.columns for col in required_columns):
+            # Results are kept per uploaded file so paging through the table doesn't re-read the CSV
+            view = st.session_state.get("oee_view")
+            if view is None or st.session_state.get("oee_view_file") != uploaded_file.file_id:
+                df = pd.read_csv(uploaded_file)
+ 	            # st.write("Preview of uploaded data:")
+                view = PagedView(calculate_oee(df)) if all(col in df.columns for col in REQUIRED_COLUMNS) else None
+                st.session_state["oee_view"] = view
+                st.session_state["oee_view_file"] = uploaded_file.file_id
+            if view is None:
                 st.error("❌ CSV is missing required columns.")
             else:
-                result_df = calculate_oee(df.copy())
-                result_df_display = result_df[["Availability", "Performance", "Quality", "OEE"]].copy()
-                result_df_display = result_df_display.applymap(lambda x: f"{x*100:.2f}%" if isinstance(x, float) else x)
+                result_df = view.df
                 st.success("✅ OEE Calculated for Uploaded Data")
-                st.dataframe(result_df_display)
+                render_paged_table(view, [col for col in ["Description", "Availability", "Performance", "Quality", "OEE"]
+                                          if col in result_df.columns], "oee_results")
 
-                export_df = result_df.copy()
-                st.download_button("📥 Download OEE Results (CSV)", data=export_df.to_csv(index=False).encode("utf-8"),
+                # Deferred: the CSV is only written when the button is clicked, not on every page turn
+                st.download_button("📥 Download OEE Results (CSV)", data=lambda: export_file(result_df, "csv"),
                                    file_name="oee_batch_results.csv", mime="text/csv")
         except Exception as e:
             st.error(f"An error occurred: {e}")
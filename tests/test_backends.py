@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from oee_engine import KPI_COLUMNS, available_backends, calculate_kpis
+
+# Includes rows that divide by zero (no run time, no output, no ideal cycle time) and missing values
+DATA = pd.DataFrame({
+    "Description": ["M1", "M2", "M3", "M4", "M5", "M6"],
+    "Planned Production Time": [480.0, 480.0, 0.0, 480.0, np.nan, 300.0],
+    "Downtime": [30.0, 480.0, 0.0, 20.0, 10.0, 15.5],
+    "Total Count": [900, 0, 0, 1000, 500, 250],
+    "Good Count": [880, 0, 0, 990, 490, 249],
+    "Ideal Cycle Time": [0.4, 0.5, 0.3, 0.0, 0.4, 1.1],
+})
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_backends_match_pandas(backend):
+    expected = calculate_kpis(DATA.copy(), "pandas")
+    result = calculate_kpis(DATA.copy(), backend)
+    pd.testing.assert_frame_equal(result[KPI_COLUMNS], expected[KPI_COLUMNS], check_dtype=False)
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+from oee_engine.cli import main
+
+
+@pytest.fixture
+def production_file(tmp_path):
+    path = tmp_path / "line1.csv"
+    pd.DataFrame({
+        "Description": ["M1", "M2"],
+        "Planned Production Time": [480.0, 450.0],
+        "Downtime": [30.0, 45.0],
+        "Total Count": [1000, 900],
+        "Good Count": [980, 870],
+        "Ideal Cycle Time": [0.4, 0.45],
+    }).to_csv(path, index=False)
+    return path
+
+
+def test_fleet_output_inside_a_new_output_dir(production_file, tmp_path):
+    out = tmp_path / "out"
+    assert main([str(production_file), "-o", str(out), "--fleet-output", str(out / "fleet.csv")]) == 0
+    assert pd.read_csv(out / "fleet.csv")["Records"].tolist() == [2, 2]
+
+
+def test_fleet_output_dir_must_exist(production_file, tmp_path):
+    with pytest.raises(SystemExit):
+        main([str(production_file), "--fleet-output", str(tmp_path / "missing" / "fleet.csv")])
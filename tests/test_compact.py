@@ -0,0 +1,19 @@
+import pandas as pd
+
+from oee_engine import alert_counts, calculate_kpis, compact_kpis
+
+
+def test_compact_alerts_match_at_exact_benchmarks():
+    # Availability is exactly 0.9 and Quality exactly 0.99, which float32 ratios land just below
+    df = pd.DataFrame({
+        "Description": ["M1", "M2"],
+        "Planned Production Time": [480, 500],
+        "Downtime": [48, 50],
+        "Total Count": [1000, 900],
+        "Good Count": [990, 891],
+        "Ideal Cycle Time": [0.4, 0.5],
+    })
+    compact = compact_kpis(df.copy(), ["Availability", "Performance", "Quality", "OEE", "Scrap Rate (%)",
+                                       "Yield vs. Planned Output (%)"])
+    assert alert_counts(compact) == alert_counts(calculate_kpis(df.copy()))
+    assert alert_counts(compact)["Availability"] == 0
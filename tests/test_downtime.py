@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from oee_engine import apply_event_downtime, merge_events
+
+
+def brute_force_union(events):
+    # {machine: [(start, end)]} of merged stops, by the textbook sort-and-extend merge
+    merged = {}
+    for machine, group in events.sort_values(["Description", "Start"]).groupby("Description"):
+        runs = []
+        for start, end in zip(group["Start"], group["End"]):
+            if runs and start <= runs[-1][1]:
+                runs[-1][1] = max(runs[-1][1], end)
+            else:
+                runs.append([start, end])
+        merged[machine] = runs
+    return merged
+
+
+def random_events(rng, count=400):
+    base = pd.Timestamp("2026-01-01")
+    start = base + pd.to_timedelta(rng.integers(0, 3 * 24 * 60, count), unit="min")
+    return pd.DataFrame({
+        "Description": rng.choice(["M1", "M2", "M3"], count),
+        "Start": start,
+        "End": start + pd.to_timedelta(rng.integers(1, 240, count), unit="min"),
+        "Reason": rng.choice(["Jam", "Changeover", None], count),
+    })
+
+
+def test_merged_intervals_match_brute_force_union():
+    events = random_events(np.random.default_rng(0))
+    intervals = merge_events(events)
+    expected = brute_force_union(events)
+    for machine, group in intervals.groupby("Description"):
+        assert [[start, end] for start, end in zip(group["Start"], group["End"])] == expected[machine]
+
+
+def test_window_downtime_matches_brute_force_overlap():
+    rng = np.random.default_rng(1)
+    events = random_events(rng)
+    records = pd.DataFrame({
+        "Description": rng.choice(["M1", "M2", "M3", "M4"], 300),
+        "Timestamp": pd.Timestamp("2026-01-01") + pd.to_timedelta(rng.integers(-600, 5000, 300), unit="min"),
+        "Planned Production Time": rng.integers(1, 600, 300).astype(float),
+    })
+    result, _, _, _ = apply_event_downtime(records, events)
+    union = brute_force_union(events)
+    for row, downtime in zip(records.itertuples(index=False), result["Downtime"]):
+        start = row.Timestamp
+        end = start + pd.Timedelta(minutes=row._2)
+        overlap = sum(max(pd.Timedelta(0), min(end, e) - max(start, s)) / pd.Timedelta(minutes=1)
+                      for s, e in union.get(row.Description, []))
+        assert np.isclose(downtime, overlap)
+
+
+def test_records_without_a_window_get_no_downtime():
+    events = pd.DataFrame({"Description": ["M1"], "Start": ["2026-01-01 00:10"], "End": ["2026-01-01 00:40"]})
+    records = pd.DataFrame({
+        "Description": ["M1", "M1", "M1"],
+        "Timestamp": ["2026-01-01 00:00", None, "not a time"],
+        "Planned Production Time": [60.0, 60.0, 60.0],
+    })
+    downtime = apply_event_downtime(records, events)[0]["Downtime"].tolist()
+    assert downtime[0] == 30.0
+    assert np.isnan(downtime[1]) and np.isnan(downtime[2])
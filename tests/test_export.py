@@ -0,0 +1,18 @@
+import gzip
+import io
+
+import pandas as pd
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from oee_engine import OUTPUT_FORMATS, export_file, read_table
+
+RESULTS = pd.DataFrame({"Description": ["M1", "M2"], "OEE": [0.75, 0.5]})
+
+
+@pytest.mark.parametrize("fmt", OUTPUT_FORMATS)
+def test_export_is_accepted_by_download_button(fmt):
+    data, _ = convert_data_to_bytes_and_infer_mime(export_file(RESULTS, fmt), RuntimeError("unsupported"))
+    if fmt == "csv.gz":
+        data, fmt = gzip.decompress(data), "csv"
+    pd.testing.assert_frame_equal(read_table(io.BytesIO(data), fmt, columns=None), RESULTS)
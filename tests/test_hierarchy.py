@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from oee_engine import KPICube, accumulate_totals, fleet_kpis, machine_sums, new_totals
+
+MAPPING = pd.DataFrame({
+    "Plant": ["North", "North", "North", "South"],
+    "Line": ["L1", "L1", "L2", "L3"],
+    "Description": ["M1", "M2", "M3", "M4"],
+})
+
+
+def records(rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    total = rng.integers(100, 1000, rows)
+    return pd.DataFrame({
+        "Description": rng.choice(["M1", "M2", "M3", "M4", "M5"], rows),
+        "Planned Production Time": rng.uniform(400, 480, rows),
+        "Downtime": rng.uniform(0, 60, rows),
+        "Total Count": total,
+        "Good Count": total - rng.integers(0, 20, rows),
+        "Ideal Cycle Time": rng.uniform(0.2, 0.4, rows),
+    })
+
+
+def direct(df):
+    return fleet_kpis(accumulate_totals(new_totals(), df))
+
+
+def test_every_node_matches_direct_aggregation():
+    df = records()
+    cube = KPICube(machine_sums(df), MAPPING)
+    with_parents = df.merge(MAPPING, on="Description", how="left").fillna({"Plant": "(unassigned)", "Line": "(unassigned)"})
+    assert cube.unassigned == 1
+    for depth, levels in ((1, ["Plant"]), (2, ["Plant", "Line"]), (3, ["Plant", "Line", "Description"])):
+        for path in cube.paths(depth):
+            mask = np.logical_and.reduce([with_parents[level] == key for level, key in zip(levels, path)])
+            expected = direct(with_parents[mask])
+            for name, value in cube.node(path).items():
+                assert value == pytest.approx(expected[name])
+    for name, value in cube.node().items():
+        assert value == pytest.approx(direct(df)[name])
+
+
+def test_children_sum_to_their_parent():
+    cube = KPICube(machine_sums(records()), MAPPING)
+    lines = cube.children(("North",))
+    assert lines["Line"].tolist() == ["L1", "L2"]
+    assert lines["Records"].sum() == cube.node(("North",))["Records"]
@@ -0,0 +1,50 @@
+import pytest
+
+from oee_engine import IncrementalKPIs
+
+HEADER = b"Record ID,Description,Timestamp,Planned Production Time,Downtime,Total Count,Good Count,Ideal Cycle Time\n"
+ROW_1 = b"1,M1,2026-01-01 00:00:00,480,20,900,880,0.4\n"
+ROW_2 = b"2,M2,2026-01-01 00:00:00,480,2.5,800,790,0.5\n"
+
+
+def test_key_column_outside_the_read_projection():
+    state = IncrementalKPIs(["Record ID"])
+    state.update_bytes(HEADER + ROW_1)
+    state.update_bytes(HEADER + ROW_1 + ROW_2)
+    assert state.rows == 2
+    assert state.last_delta == 1
+
+
+def test_missing_key_column_is_reported():
+    with pytest.raises(ValueError, match="Record No"):
+        IncrementalKPIs(["Record No"]).update_bytes(HEADER + ROW_1)
+
+
+def test_rows_match_when_a_later_file_infers_other_dtypes():
+    # ROW_2's 2.5 turns Downtime into floats, and the re-export misses the byte-prefix fast path
+    state = IncrementalKPIs()
+    state.update_bytes(HEADER + ROW_1)
+    state.update_bytes(HEADER + ROW_2 + ROW_1)
+    assert state.rows == 2
+    assert state.last_delta == 1
+
+
+def test_failed_upload_is_not_remembered():
+    state = IncrementalKPIs(["Record ID"])
+    bad = HEADER.replace(b"Record ID", b"Record No") + ROW_1
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            state.update_bytes(bad)
+    state.update_bytes(HEADER + ROW_1)
+    state.update_bytes(HEADER + ROW_1 + ROW_2)
+    assert state.rows == 2
+
+
+def test_invalid_rows_are_rejected_once():
+    bad = b"3,M3,2026-01-01 00:00:00,480,abc,700,690,0.5\n"
+    state = IncrementalKPIs()
+    state.update_bytes(HEADER + ROW_1 + bad)
+    state.update_bytes(HEADER + ROW_1 + bad + ROW_2)
+    assert state.rows == 2
+    assert state.rejected == 1
+    assert state.rejects()["Failed Rules"].tolist() == ["missing or non-numeric value"]
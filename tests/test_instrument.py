@@ -0,0 +1,42 @@
+import time
+import tracemalloc
+
+import pytest
+
+from oee_engine import StageTimer
+
+
+def test_outer_stage_keeps_its_peak_across_a_nested_stage():
+    timer = StageTimer(enabled=True)
+    with timer.stage("outer"):
+        block = bytearray(20_000_000)
+        del block
+        with timer.stage("inner"):
+            pass
+    peaks = {record["stage"]: record["peak_alloc_bytes"] for record in timer.records}
+    assert peaks["outer"] >= 20_000_000
+    assert peaks["inner"] < 1_000_000
+
+
+def test_tracing_stops_when_a_stage_is_interrupted():
+    # Streamlit ends a script run early by raising; tracing must not outlive it
+    timer = StageTimer(enabled=True)
+    with pytest.raises(KeyboardInterrupt):
+        with timer.stage("interrupted"):
+            assert tracemalloc.is_tracing()
+            raise KeyboardInterrupt
+    assert not tracemalloc.is_tracing()
+
+
+def test_total_counts_nested_stages_once():
+    timer = StageTimer(enabled=True, trace_memory=False)
+    with timer.stage("outer"):
+        with timer.stage("inner"):
+            time.sleep(0.05)
+    assert timer.total_seconds() == timer.records[-1]["seconds"]
+
+
+def test_repeated_stage_is_one_record():
+    timer = StageTimer(enabled=True, trace_memory=False)
+    assert list(timer.iterate("read_chunk", range(3))) == [0, 1, 2]
+    assert [(record["stage"], record["calls"]) for record in timer.records] == [("read_chunk", 4)]
@@ -0,0 +1,27 @@
+import json
+import socket
+import time
+
+from oee_engine import RollingOEE, SocketFeed
+
+RECORD = {"Description": "M1", "Planned Production Time": 60.0, "Downtime": 5.0, "Total Count": 100,
+          "Good Count": 98, "Ideal Cycle Time": 0.5}
+
+
+def test_malformed_socket_lines_are_rejected():
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        feed = SocketFeed("127.0.0.1", server.getsockname()[1])
+        assert feed.poll() == []
+        conn, _ = server.accept()
+        with conn:
+            conn.sendall(json.dumps(RECORD).encode("utf-8") + b"\n{not json\n\xff\xfe\n[1, 2]\n")
+            records = []
+            for _ in range(50):
+                records += feed.poll()
+                if len(records) == 4:
+                    break
+                time.sleep(0.01)
+        feed.close()
+    rolling = RollingOEE().extend(records)
+    assert (rolling.received, rolling.rejected) == (1, 3)
+    assert rolling.kpis()["Quality"] == 0.98
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from oee_engine import combine_rollups, kpis_from_sums, rollup_kpis, rollup_sums
+
+RECORDS = pd.DataFrame({
+    "Description": ["M1", "M1", "M1", "M2"],
+    "Timestamp": ["2026-01-05 06:00", "2026-01-05 10:00", "2026-01-05 15:00", "2026-01-05 07:00"],
+    "Planned Production Time": [480.0, 60.0, 480.0, 480.0],
+    "Downtime": [48.0, 30.0, 0.0, 0.0],
+    "Total Count": [1000, 50, 1200, 900],
+    "Good Count": [990, 40, 1188, 900],
+    "Ideal Cycle Time": [0.4, 0.5, 0.4, 0.5],
+})
+
+
+def test_bucket_kpis_are_weighted_by_time_and_count():
+    day = rollup_kpis(RECORDS, "day").set_index("Description")
+    # M1: run time 432 + 30 + 480, ideal time 400 + 25 + 480, planned 1020, good 2218 of 2250
+    assert day.loc["M1", "Availability"] == pytest.approx(942 / 1020)
+    assert day.loc["M1", "Performance"] == pytest.approx(905 / 942)
+    assert day.loc["M1", "Quality"] == pytest.approx(2218 / 2250)
+    assert day.loc["M1", "OEE"] == pytest.approx(942 / 1020 * 905 / 942 * 2218 / 2250)
+    # Not the mean of the row-level ratios, which the short 60-minute record would drag down
+    assert day.loc["M1", "Availability"] != pytest.approx((0.9 + 0.5 + 1.0) / 3)
+
+
+def test_shift_buckets_start_at_six():
+    shifts = rollup_kpis(RECORDS, "shift")
+    m1 = shifts[shifts["Description"] == "M1"]
+    assert m1["Period"].dt.hour.tolist() == [6, 14]
+    assert m1["Records"].tolist() == [2, 1]
+
+
+def test_partial_rollups_combine_to_the_whole():
+    parts = [rollup_sums(RECORDS.iloc[:2], "day"), rollup_sums(RECORDS.iloc[2:], "day")]
+    pd.testing.assert_frame_equal(kpis_from_sums(combine_rollups(parts)), kpis_from_sums(rollup_sums(RECORDS, "day")),
+                                  check_dtype=False)
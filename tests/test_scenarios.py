@@ -0,0 +1,20 @@
+import pandas as pd
+
+from oee_engine import scenarios
+
+BASE = pd.DataFrame({
+    "Planned Production Time": [480.0, 500.0, 450.0],
+    "Downtime": [40.0, 60.0, 20.0],
+    "Total Count": [900.0, 800.0, 1000.0],
+    "Good Count": [880.0, 790.0, 950.0],
+    "Ideal Time": [360.0, 400.0, 380.0],
+    "Planned Output": [1200.0, 1000.0, 1100.0],
+})
+SPECS = {"Downtime": ("normal", 1.0, 0.1), "Speed": ("uniform", 0.9, 1.1), "Scrap": ("triangular", 0.5, 1.0, 1.5)}
+
+
+def test_results_do_not_depend_on_the_block_size(monkeypatch):
+    whole, _, _ = scenarios.simulate(BASE, SPECS, scenarios=1_000, per_machine=True, seed=7)
+    monkeypatch.setattr(scenarios, "BLOCK_CELLS", 300)
+    blocked, _, _ = scenarios.simulate(BASE, SPECS, scenarios=1_000, per_machine=True, seed=7)
+    pd.testing.assert_frame_equal(whole, blocked)
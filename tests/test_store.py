@@ -0,0 +1,15 @@
+import pandas as pd
+
+from oee_engine import KPIStore
+
+RECORD = {"Description": "M1", "Timestamp": "2026-01-01 06:00:00", "Planned Production Time": 480, "Downtime": 20,
+          "Total Count": 900, "Good Count": 880, "Ideal Cycle Time": 0.4}
+
+
+def test_same_record_with_other_dtypes_is_stored_once(tmp_path):
+    with KPIStore(str(tmp_path / "history.sqlite")) as store:
+        assert store.append(pd.DataFrame([RECORD])) == 1
+        other = pd.DataFrame([RECORD]).astype({"Downtime": float})
+        other["Timestamp"] = pd.to_datetime(other["Timestamp"])
+        assert store.append(other) == 0
+        assert store.summary()["Records"].tolist() == [1]
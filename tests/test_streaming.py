@@ -0,0 +1,35 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from oee_engine import accumulate_totals, calculate_kpis, calculate_kpis_streaming, fleet_kpis, new_totals
+
+
+def production_csv(rows=2_500, seed=0):
+    rng = np.random.default_rng(seed)
+    total = rng.integers(100, 1000, rows)
+    df = pd.DataFrame({
+        "Description": rng.choice(["M1", "M2", "M3"], rows),
+        "Planned Production Time": rng.uniform(400, 480, rows).round(1),
+        "Downtime": rng.uniform(0, 60, rows).round(1),
+        "Total Count": total,
+        "Good Count": total - rng.integers(0, 20, rows),
+        "Ideal Cycle Time": rng.uniform(0.2, 0.4, rows).round(3),
+    })
+    return df.to_csv(index=False).encode("utf-8")
+
+
+@pytest.mark.parametrize("chunksize", [100, 333, 10_000])
+def test_streamed_totals_match_the_whole_file(chunksize):
+    data = production_csv()
+    whole = calculate_kpis(pd.read_csv(io.BytesIO(data)))
+    chunks = []
+    totals = None
+    for chunk, totals in calculate_kpis_streaming(io.BytesIO(data), chunksize=chunksize, fmt="csv"):
+        chunks.append(chunk)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), whole)
+    expected = fleet_kpis(accumulate_totals(new_totals(), whole))
+    for name, value in fleet_kpis(totals).items():
+        assert value == pytest.approx(expected[name])